@@ -1,18 +1,43 @@
 from flask import Flask, render_template, request, jsonify
-from flask import Response, send_from_directory
+from flask import Response, send_from_directory, has_request_context, after_this_request, g
+import asyncio
 import csv
 import io
-import requests
 import os
 import time
-import random
-from urllib.parse import quote_plus
-from collections import defaultdict
+import threading
+import heapq
+import functools
+import itertools
+from collections import defaultdict, deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
 from bs4 import BeautifulSoup
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import re
-from markupsafe import Markup
 import logging
+import hashlib
+import json
+import sqlite3
+import zlib
+import archive
+import cache_backends
+import crawl_engine
+import http_session
+import scheduler
+import snapshot
+import structured_log
+import instrumentation
+import tracing
+import transport
+from article_cache import ArticleCache, ArticlePrefetcher, canonical_link
+from search_index import SearchIndex, parse_query
+import list_parser
+from list_parser import parse_list_page
+import encoding_resolver
+from encoding_resolver import resolve_encoding
+
+# 模板渲染记为请求轨迹中的一个 span
+render_template = tracing.traced('render_template', detail_arg=0)(render_template)
 
 # 配置日志 - 适配Vercel无服务器环境
 def setup_logging():
@@ -23,19 +48,11 @@ def setup_logging():
     is_vercel = os.environ.get('VERCEL') or os.environ.get('NOW_REGION')
     
     if is_vercel:
-        # Vercel环境：简化日志，避免文件操作
-        logging.basicConfig(
-            level=logging.INFO,  # Vercel生产环境使用INFO级别
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[logging.StreamHandler()]
-        )
+        # Vercel环境：INFO级别，同步写出（函数冻结后后台线程无法及时写出）
+        structured_log.setup(default_level=logging.INFO, default_async=False)
     else:
-        # 本地开发环境：详细日志
-        logging.basicConfig(
-            level=logging.DEBUG,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[logging.StreamHandler()]
-        )
+        # 本地开发环境：详细日志，经队列异步写出
+        structured_log.setup(default_level=logging.DEBUG, default_async=True)
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -56,15 +73,86 @@ def serve_image(filename):
     static_folder = app.static_folder or 'static'
     return send_from_directory(os.path.join(static_folder, 'image'), filename)
 
-# 简单内存缓存：key=(website), value={"data": list, "ts": epoch_seconds}
+# 简单内存缓存：key=(website), value={"data": list, "ts": epoch_seconds, "modified": 内容最近变化时间,
+#   "digest": 内容哈希, "version": int, "index": SearchIndex}
 CACHE_TTL_SECONDS = 60  # 1分钟，加快缓存刷新
+# stale-while-revalidate：超过 CACHE_TTL_SECONDS（软过期）直接返回旧数据并在后台刷新，
+# 超过 CACHE_HARD_TTL_SECONDS（硬过期）才阻塞请求重新抓取
+CACHE_HARD_TTL_SECONDS = int(os.environ.get('CACHE_HARD_TTL_SECONDS', '600'))
 _cache = {}
+# 缓存与指标的读写锁；_inflight 记录每个来源正在进行的抓取（single-flight）
+_cache_lock = threading.Lock()
+_inflight = {}
+# 每次写入来源数据时分配的全局递增版本号，用于使依赖该来源的视图失效
+_cache_versions = itertools.count(1)
+
+# 视图缓存：(来源元组, 搜索词) -> {versions, data}，按LRU保留最近的若干个
+VIEW_CACHE_MAX_ENTRIES = int(os.environ.get('VIEW_CACHE_MAX_ENTRIES', '128'))
+_views = OrderedDict()
+_views_lock = threading.Lock()
+_view_stats = {'hits': 0, 'misses': 0}
+
+# 多来源聚合：并发抓取的线程数上限与总截止时间（秒）
+FETCH_MAX_WORKERS = int(os.environ.get('FETCH_MAX_WORKERS', '4'))
+AGGREGATE_DEADLINE_SECONDS = float(os.environ.get('AGGREGATE_DEADLINE_SECONDS', '8'))
+# 模块级线程池：超过截止时间的抓取会在后台继续完成并写入缓存，不阻塞当前请求
+_fetch_executor = ThreadPoolExecutor(max_workers=FETCH_MAX_WORKERS, thread_name_prefix='news-fetch')
 
 # 观测：抓取指标与错误日志（内存）
 _metrics = {
     'last_fetch': {},  # website -> {ts, duration_ms, count}
+    'cache': {},  # website -> {fresh_hits, stale_hits, misses, background_refreshes}
+    'conditional': {'not_modified': 0, 'unchanged_body': 0, 'parsed': 0},  # 列表页条件请求结果
+    'fallback': {},  # website -> {primary_ok, fallback_ok, all_failed, failed_candidates_s}
+    'incremental': {},  # website -> {new_items, history, seen_links}（INCREMENTAL_CRAWL）
 }
-_errors = []  # [{ts, website, stage, message}]
+# 错误日志：固定长度的环形缓冲，另按来源、阶段累计次数
+ERROR_LOG_SIZE = int(os.environ.get('ERROR_LOG_SIZE', '500'))
+_errors = deque(maxlen=ERROR_LOG_SIZE)  # [{ts, website, stage, message}]
+_error_counts = {}  # website -> {stage: 次数}
+_errors_lock = threading.Lock()
+
+# 列表页验证器：url -> {etag, last_modified, body_hash, items}
+# 用于条件请求（If-None-Match / If-Modified-Since），内容未变化时直接复用上次解析结果
+_crawl_validators = {}
+_validators_lock = threading.Lock()
+
+# 增量抓取：每次只提取列表页上新出现的链接，并入按来源滚动保留的历史（即 _cache 中的列表），
+# 分页与搜索因此可以覆盖列表页上已经看不到的旧新闻；历史按条数与时间窗口（天，0 表示不限）裁剪
+INCREMENTAL_CRAWL = os.environ.get('INCREMENTAL_CRAWL', '0') == '1'
+HISTORY_MAX_ITEMS = int(os.environ.get('HISTORY_MAX_ITEMS', '500'))
+HISTORY_MAX_DAYS = int(os.environ.get('HISTORY_MAX_DAYS', '30'))
+_seen_links = {}  # website -> OrderedDict(link -> None)，受 _cache_lock 保护
+
+# 新闻正文缓存（按规范化链接，含404/无效链接等负缓存）
+_article_cache = ArticleCache()
+
+# 新闻归档（ARCHIVE_DB）：抓取到的列表与正文写入 SQLite，重启后历史仍在；
+# 带搜索词、日期范围或游标的请求从归档查询（标题与正文全文检索）。未配置时为 None
+_archive = archive.open_default()
+# 页面从归档读取的最多条数，页码分页在这些行内进行；更深的历史通过 /fetch_news 的游标翻页
+ARCHIVE_VIEW_LIMIT = int(os.environ.get('ARCHIVE_VIEW_LIMIT', '500'))
+# /export 从归档导出的最多条数
+ARCHIVE_EXPORT_LIMIT = int(os.environ.get('ARCHIVE_EXPORT_LIMIT', '100000'))
+
+# 缓存后端（CACHE_BACKEND）：_cache 与正文缓存是本进程的一级缓存，后端为多个 worker 进程共享的二级缓存，
+# 列表与正文的抓取由后端的锁保证同时只在一个进程中进行
+try:
+    _backend = cache_backends.from_url()
+except (ValueError, cache_backends.BackendError) as exc:
+    logging.getLogger(__name__).error("缓存后端不可用（%s），改用进程内缓存", exc)
+    _backend = cache_backends.MemoryBackend()
+# 共享列表数据的保留时间（秒）；抓取锁的过期时间、未拿到锁时等待其他进程结果的最长时间与轮询间隔（秒）
+SHARED_NEWS_TTL_SECONDS = int(os.environ.get('SHARED_NEWS_TTL_SECONDS', '86400'))
+CACHE_LOCK_TTL_S = float(os.environ.get('CACHE_LOCK_TTL_S', '60'))
+CACHE_LOCK_WAIT_S = float(os.environ.get('CACHE_LOCK_WAIT_S', '15'))
+CACHE_LOCK_POLL_S = float(os.environ.get('CACHE_LOCK_POLL_S', '0.2'))
+
+# 不展示、不归档的链接
+INVALID_NEWS_LINKS = (
+    "https://travel.cnr.cn/travel.cnr.cn/mlzgtgx",
+    "https://travel.cnr.cn/travel.cnr.cn/hydt/",
+)
 
 def _check_admin_key():
     expected = os.environ.get('ADMIN_KEY', '').strip()
@@ -79,6 +167,7 @@ websites = {
         "url": "https://www.ctnews.com.cn/jujiao/node_1823.html",
         "link_css": 'a[href*="/content/"]',
         "base_url": "https://www.ctnews.com.cn",
+        "encoding": "utf-8",  # 编码提示：页面未声明编码时优先尝试
         "date_pattern": r"/content/(\\d{4}-\\d{2})/(\\d{2})/"
     },
     "人民网旅游频道": {
@@ -95,6 +184,7 @@ websites = {
         "url": "https://travel.cnr.cn/",
         "link_css": 'a[href]:not([href*="javascript"]):not([href*="#"])',  # 宽松选择器
         "base_url": "https://travel.cnr.cn",
+        "encoding": "gbk",
         "date_pattern": None
     }
 }
@@ -105,16 +195,35 @@ WECHAT_ALBUM_URL = "https://mp.weixin.qq.com/mp/appmsgalbum?__biz=MzA4ODA2ODMzNA
 # 公司周报数据（从微信专栏实际抓取）
 company_reports = []
 
-def get_wechat_reports():
-    """获取微信专栏的公司周报内容（增强版）"""
+# 公司周报缓存：启用调度时由调度器刷新；否则过期后在请求中刷新
+REPORTS_TTL_SECONDS = int(os.environ.get('REPORTS_TTL_SECONDS', '1800'))
+_reports = {'data': None, 'ts': 0}
+_reports_lock = threading.Lock()
+
+def refresh_wechat_reports():
+    """抓取微信专栏的公司周报内容（增强版）并写入缓存；抓取为空时保留旧数据"""
     try:
         from enhanced_reports import enhanced_wechat_reports
         reports = enhanced_wechat_reports()
-        return reports
-        
     except Exception as e:
         logger.error(f"获取微信专栏失败: {str(e)}")
-        return []  # 返回空列表，不使用示例数据
+        reports = []  # 返回空列表，不使用示例数据
+    with _reports_lock:
+        if reports or _reports['data'] is None:
+            _reports['data'] = reports
+        _reports['ts'] = time.time()
+        data = _reports['data']
+    _snapshot.mark_dirty()
+    return data
+
+def get_wechat_reports():
+    """读取公司周报缓存；缓存为空，或未启用调度且已过期时才抓取"""
+    _snapshot.ensure_loaded()
+    with _reports_lock:
+        data, age = _reports['data'], time.time() - _reports['ts']
+    if data is not None and (scheduler.SCHEDULER_MODE != 'off' or age < REPORTS_TTL_SECONDS):
+        return data
+    return _single_flight('wechat_reports', refresh_wechat_reports)
 
 
 ALL_SOURCES_LABEL = "全部来源"
@@ -132,55 +241,13 @@ def index():
         selected_sources = [s for s in [x.strip() for x in sources_str.split(',')] if s] if sources_str else []
         search_text = request.args.get('search', '')
         
+        date_from, date_to = _date_range_args()
+        
         # 支持强制刷新 ?refresh=1
         refresh = request.args.get('refresh', '0') == '1'
-        # 获取新闻数据（带缓存），支持聚合与多来源选择
-        if selected_sources:
-            valid_sources = [s for s in selected_sources if s in websites]
-            aggregated = []
-            for site in valid_sources:
-                aggregated.extend(get_news_with_cache(site, force_refresh=refresh))
-            # 去重（按链接）
-            seen = set()
-            deduped = []
-            for item in aggregated:
-                link = item.get('link')
-                if link and link not in seen:
-                    seen.add(link)
-                    deduped.append(item)
-            deduped.sort(key=lambda x: x.get('date', ''), reverse=True)
-            news_data = deduped
-        elif website == ALL_SOURCES_LABEL:
-            # 聚合所有来源
-            aggregated = []
-            for site in websites.keys():
-                aggregated.extend(get_news_with_cache(site, force_refresh=refresh))
-            # 去重（按链接）
-            seen = set()
-            deduped = []
-            for item in aggregated:
-                link = item.get('link')
-                if link and link not in seen:
-                    seen.add(link)
-                    deduped.append(item)
-            # 按日期倒序
-            deduped.sort(key=lambda x: x.get('date', ''), reverse=True)
-            news_data = deduped
-        else:
-            news_data = get_news_with_cache(website, force_refresh=refresh)
-
-        # 去重（按链接），即使是单个网站也可能有重复
-        seen = set()
-        deduped = []
-        for item in news_data:
-            link = item.get('link')
-            if link and link not in seen:
-                seen.add(link)
-                deduped.append(item)
-        news_data = deduped
-
-        # 公共过滤
-        news_data = filter_news(news_data, search_text)
+        # 获取新闻数据（带缓存），支持聚合与多来源选择；聚合、去重、过滤与排序由视图统一完成
+        news_data = get_request_view(resolve_sources(website, selected_sources), search_text, date_from, date_to,
+                                     force_refresh=refresh)
         
         # 获取当前时间
         now = datetime.now()
@@ -197,20 +264,31 @@ def index():
         start = (page - 1) * page_size
         end = start + page_size
         paged_news = news_data[start:end]
-        total_pages = max((len(news_data) + page_size - 1) // page_size, 1)
+        total_pages = len(news_data.page_bounds(page_size))
+
+        # 指标徽章：最近一次抓取 + 缓存年龄与状态（聚合时取最旧的来源）
+        metrics_key = website if website != ALL_SOURCES_LABEL else '聚合'
+        with _cache_lock:
+            metrics = _metrics['last_fetch'].get(metrics_key)
+        if metrics:
+            statuses = [_cache_status(site) for site in resolve_sources(website, selected_sources)]
+            if statuses:
+                metrics = dict(metrics, **max(statuses, key=lambda st: st['age_s']))
 
         return render_template('index.html', 
                               news_data=paged_news, 
                               websites=[ALL_SOURCES_LABEL] + list(websites.keys()), 
                               current_website=website,
                               search_text=search_text,
+                              date_from=date_from or '',
+                              date_to=date_to or '',
                               selected_sources=','.join(selected_sources),
                               news_count=len(news_data),
                               page=page,
                               page_size=page_size,
                               total_pages=total_pages,
                               now=now,
-                              metrics=_metrics['last_fetch'].get(website if website != ALL_SOURCES_LABEL else '聚合', None),
+                              metrics=metrics,
                               tab_type=tab_type,
                               company_reports=[])
     
@@ -219,15 +297,7 @@ def index():
         # 获取公司周报数据
         reports_data = get_wechat_reports()
         
-        # 调试信息：打印实际抓取到的数据
-        print("=== 公司周报数据调试信息 ===")
-        print(f"抓取到的周报数量: {len(reports_data)}")
-        for i, report in enumerate(reports_data[:3]):
-            print(f"周报 {i+1}:")
-            print(f"  标题: {repr(report.get('title', ''))}")
-            print(f"  链接: {report.get('link', '')}")
-            print(f"  日期: {report.get('date', '')}")
-        print("==========================")
+        logger.debug("公司周报: %d 篇", len(reports_data))
         
         # 获取当前时间
         now = datetime.now()
@@ -251,6 +321,8 @@ def index():
                               websites=[ALL_SOURCES_LABEL] + list(websites.keys()), 
                               current_website='公司周报',
                               search_text='',
+                              date_from='',
+                              date_to='',
                               selected_sources='',
                               news_count=len(reports_data),
                               page=page,
@@ -261,50 +333,36 @@ def index():
                               tab_type=tab_type,
                               company_reports=paged_reports)
 
+@tracing.traced('filter_news')
+@instrumentation.timed('filter')
 def filter_news(news_data, search_text):
     # 添加过滤前后的日志
     logger.debug(f"Before filter - News count: {len(news_data)}")
     
-    # 过滤无效链接
-    invalid_links = [
-        "https://travel.cnr.cn/travel.cnr.cn/mlzgtgx",
-        "https://travel.cnr.cn/travel.cnr.cn/hydt/"
-    ]
+    # 关键词过滤：按空白切分为多个词，需全部命中（先过滤可减少后续处理量）
+    query = parse_query(search_text or '')
+    if query:
+        logger.debug(f"Applying search filter: '{search_text}'")
+        news_data = [news for news in news_data if query.matches(news.get('title', ''))]
+        logger.debug(f"After text filter - News count: {len(news_data)}")
     
     # 过滤无效链接
     filtered_news = []
     for news in news_data:
         link = news.get('link', '')
         # 跳过无效链接
-        if link in invalid_links:
+        if link in INVALID_NEWS_LINKS:
             logger.debug(f"Filtering invalid link: {link}")
             continue
         filtered_news.append(news)
     news_data = filtered_news
     logger.debug(f"After invalid link filter - News count: {len(news_data)}")
     
-    # 关键词过滤
-    if search_text:
-        logger.debug(f"Applying search filter: '{search_text}'")
-        filtered_news = []
-        for news in news_data:
-            if search_text.lower() in str(news.get('title','')).lower():
-                filtered_news.append(news)
-        news_data = filtered_news
-        logger.debug(f"After text filter - News count: {len(news_data)}")
-    
-    # 若有搜索词，进行命中优先排序：完全命中 > 子串命中；同组按日期倒序
-    if search_text:
+    # 若有搜索词，进行命中优先排序：完全命中 > 部分命中；同组按日期倒序
+    if query:
         logger.debug(f"Sorting with search priority")
-        s = search_text.lower()
-        def score(item):
-            title = str(item.get('title',''))
-            tl = title.lower()
-            exact = 1 if tl == s else 0
-            contains = 1 if s in tl else 0
-            # 更高的元组将排前（Python默认从前到后比较）
-            return (exact, contains, str(item.get('date','')))
-        news_data.sort(key=score, reverse=True)
+        # 更高的元组将排前（Python默认从前到后比较）
+        news_data.sort(key=lambda item: (query.is_exact(item.get('title', '')), str(item.get('date', ''))), reverse=True)
     else:
         # 默认按日期倒序
         logger.debug("Sorting by date descending")
@@ -330,53 +388,8 @@ def news_content():
     sources_str = request.args.get('sources', '').strip()
     selected_sources = [s for s in [x.strip() for x in sources_str.split(',')] if s] if sources_str else []
     
-    if selected_sources:
-        # 多来源选择
-        valid_sources = [s for s in selected_sources if s in websites]
-        aggregated = []
-        for site in valid_sources:
-            aggregated.extend(get_news_with_cache(site))
-        # 去重并排序
-        seen = set()
-        deduped = []
-        for item in aggregated:
-            item_link = item.get('link')
-            if item_link and item_link not in seen:
-                seen.add(item_link)
-                deduped.append(item)
-        deduped.sort(key=lambda x: x.get('date', ''), reverse=True)
-        news_data = deduped
-    elif website == ALL_SOURCES_LABEL:
-        # 对于"全部来源"，需要聚合所有网站的新闻数据
-        aggregated = []
-        for site in websites.keys():
-            aggregated.extend(get_news_with_cache(site))
-        # 去重并排序
-        seen = set()
-        deduped = []
-        for item in aggregated:
-            item_link = item.get('link')
-            if item_link and item_link not in seen:
-                seen.add(item_link)
-                deduped.append(item)
-        deduped.sort(key=lambda x: x.get('date', ''), reverse=True)
-        news_data = deduped
-    else:
-        # 对于单个网站，使用与index函数相同的方式获取数据
-        news_data = get_news_with_cache(website)
-
-    # 去重（按链接），即使是单个网站也可能有重复
-    seen = set()
-    deduped = []
-    for item in news_data:
-        item_link = item.get('link')
-        if item_link and item_link not in seen:
-            seen.add(item_link)
-            deduped.append(item)
-    news_data = deduped
-
-    # 应用与index函数相同的过滤逻辑
-    news_data = filter_news(news_data, search_text)
+    date_from, date_to = _date_range_args()
+    news_data = get_request_view(resolve_sources(website, selected_sources), search_text, date_from, date_to)
     
     # 支持分页参数
     page = request.args.get('page', '1')
@@ -389,64 +402,32 @@ def news_content():
     except Exception:
         page, page_size = 1, 12
         
-    # 计算当前页的起始和结束索引
-    start_index = (page - 1) * page_size
-    end_index = start_index + page_size
-    
-    # 根据分页参数截取当前页的新闻数据
-    paged_news_data = news_data[start_index:end_index]
-    
-    # Find the news item by link
-    print(f"\n=== NEWS CONTENT DEBUG INFO ===")
-    print(f"Searching for news with link: {link}")
-    print(f"Total news items after filtering: {len(news_data)}")
-    print(f"Current page: {page}, page size: {page_size}")
-    print(f"Page range: {start_index}-{end_index}")
-    print(f"News items on current page: {len(paged_news_data)}")
-    print(f"=== END DEBUG INFO ===\n")
-    
-    news_item = None
-    global_index = None
-    
-    # 直接在完整列表中查找匹配的新闻
-    for i, item in enumerate(news_data):
-        item_link = item.get('link')
-        if item_link == link:
-            logger.info(f"Found matching news at index {i}: {item.get('title', 'No title')}")
-            news_item = item.copy()
-            global_index = i
-            # 计算这条新闻应该在第几页
-            page = (i // page_size) + 1
-            # 更新分页范围
-            start_index = (page - 1) * page_size
-            end_index = start_index + page_size
-            paged_news_data = news_data[start_index:end_index]
-            break
-    
-    if news_item is None:
-        print(f"Warning: News not found for link: {link}")
+    # 视图自带 链接 → 位置 索引：定位新闻、计算所在页与前后链接均为常数时间
+    global_index = news_data.position(link)
+    logger.debug("news_content: link=%s total=%d index=%s page_size=%d", link, len(news_data), global_index, page_size)
+
+    if global_index is None:
+        logger.warning("News not found for link: %s", link)
         return "新闻不存在", 404
 
-    content = get_news_content(link, news_item['source'])
+    news_item = news_data[global_index].copy()
+    # 计算这条新闻应该在第几页
+    page = news_data.page_of(global_index, page_size)
+
+    content = get_news_content_cached(link, news_item['source'])
     news_item['content'] = content
+
+    # 页面返回后在后台预取相邻文章，顺序阅读时“下一条”可直接命中缓存
+    if _prefetcher.enabled:
+        prefetch_targets = _prefetcher.neighbours(news_data, global_index)
+
+        @after_this_request
+        def _schedule_prefetch(response):
+            response.call_on_close(lambda: _prefetcher.schedule(prefetch_targets))
+            return response
     
     # 计算前后链接
-    prev_link = None
-    next_link = None
-    
-    if global_index is not None:
-        # 使用全局索引计算前后链接，这是最可靠的方法
-        if global_index > 0:
-            prev_link = news_data[global_index - 1]['link']
-            print(f"Using global index {global_index} to find previous link: {prev_link}")
-        else:
-            print(f"No previous link (global index is 0)")
-        
-        if global_index + 1 < len(news_data):
-            next_link = news_data[global_index + 1]['link']
-            print(f"Using global index {global_index} to find next link: {next_link}")
-        else:
-            print(f"No next link (global index is at end)")
+    prev_link, next_link = news_data.neighbour_links(global_index)
     
     return render_template('news_content.html', 
                           news_item=news_item, 
@@ -457,7 +438,9 @@ def news_content():
                           page=page,
                           page_size=page_size,
                           sources=sources_str,
-                          search=search_text)
+                          search=search_text,
+                          date_from=date_from or '',
+                          date_to=date_to or '')
 
 @app.route('/fetch_news')
 def api_fetch_news():
@@ -466,36 +449,29 @@ def api_fetch_news():
     search_text = request.args.get('search', '')
     sources_str = request.args.get('sources', '').strip()
     selected_sources = [s for s in [x.strip() for x in sources_str.split(',')] if s] if sources_str else []
-    if selected_sources:
-        valid_sources = [s for s in selected_sources if s in websites]
-        aggregated = []
-        for site in valid_sources:
-            aggregated.extend(get_news_with_cache(site, force_refresh=refresh))
-        seen = set()
-        deduped = []
-        for item in aggregated:
-            link = item.get('link')
-            if link and link not in seen:
-                seen.add(link)
-                deduped.append(item)
-        deduped.sort(key=lambda x: x.get('date', ''), reverse=True)
-        news_data = filter_news(deduped, search_text)
-    elif website == ALL_SOURCES_LABEL:
-        aggregated = []
-        for site in websites.keys():
-            aggregated.extend(get_news_with_cache(site, force_refresh=refresh))
-        seen = set()
-        deduped = []
-        for item in aggregated:
-            link = item.get('link')
-            if link and link not in seen:
-                seen.add(link)
-                deduped.append(item)
-        deduped.sort(key=lambda x: x.get('date', ''), reverse=True)
-        news_data = filter_news(deduped, search_text)
-    else:
-        news_data = filter_news(get_news_with_cache(website, force_refresh=refresh), search_text)
-    return jsonify(news_data)
+    sites = resolve_sources(website, selected_sources)
+    date_from, date_to = _date_range_args()
+    entries = load_news_sources(sites, force_refresh=refresh)
+    if _use_archive(search_text, date_from, date_to):
+        # 归档查询按游标分页：?limit= 为每页条数，下一页游标在 X-Next-Cursor 头中（没有下一页时不返回）
+        try:
+            limit = int(request.args.get('limit', '100'))
+        except ValueError:
+            limit = 100
+        rows, next_cursor = _archive.query(sites, search_text, date_from, date_to,
+                                           limit=limit, cursor=request.args.get('cursor'))
+        resp = jsonify(rows)
+        if next_cursor:
+            resp.headers['X-Next-Cursor'] = next_cursor
+        resp.headers['Cache-Control'] = f'public, max-age={CACHE_TTL_SECONDS}'
+        return resp
+    # 数据未变化时直接返回304，不再执行过滤与序列化
+    validators = _news_validators(sites, entries)
+    not_modified = _not_modified_response(*validators)
+    if not_modified is not None:
+        return not_modified
+    news_data = _filter_date_range(get_news_view(sites, search_text, entries=entries), date_from, date_to)
+    return _with_validators(jsonify(news_data), *validators)
 
 @app.route('/export')
 def export_data():
@@ -505,53 +481,107 @@ def export_data():
     search_text = request.args.get('search', '')
     sources_str = request.args.get('sources', '').strip()
     selected_sources = [s for s in [x.strip() for x in sources_str.split(',')] if s] if sources_str else []
-    # 复用聚合逻辑
-    if selected_sources:
-        valid_sources = [s for s in selected_sources if s in websites]
-        aggregated = []
-        for site in valid_sources:
-            aggregated.extend(get_news_with_cache(site, force_refresh=refresh))
-        seen = set()
-        deduped = []
-        for item in aggregated:
-            link = item.get('link')
-            if link and link not in seen:
-                seen.add(link)
-                deduped.append(item)
-        deduped.sort(key=lambda x: x.get('date', ''), reverse=True)
-        data = filter_news(deduped, search_text)
-    elif website == ALL_SOURCES_LABEL:
-        aggregated = []
-        for site in websites.keys():
-            aggregated.extend(get_news_with_cache(site, force_refresh=refresh))
-        seen = set()
-        deduped = []
-        for item in aggregated:
-            link = item.get('link')
-            if link and link not in seen:
-                seen.add(link)
-                deduped.append(item)
-        deduped.sort(key=lambda x: x.get('date', ''), reverse=True)
-        data = filter_news(deduped, search_text)
+    # 复用聚合逻辑；数据未变化时直接返回304
+    sites = resolve_sources(website, selected_sources)
+    date_from, date_to = _date_range_args()
+    entries = load_news_sources(sites, force_refresh=refresh)
+    if _use_archive(search_text, date_from, date_to):
+        # 从归档按游标分批读取，导出条数不受内存中缓存的限制
+        data = _archive.iter_query(sites, search_text, date_from, date_to, max_rows=ARCHIVE_EXPORT_LIMIT)
+        validators = None
+    else:
+        validators = _news_validators(sites, entries)
+        not_modified = _not_modified_response(*validators)
+        if not_modified is not None:
+            return not_modified
+        data = _filter_date_range(get_news_view(sites, search_text, entries=entries), date_from, date_to)
+
+    # 可选字段投影：fields=title,link
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip() in EXPORT_FIELDS]
+    gzipped = fmt.endswith('.gz')
+    base_fmt = fmt[:-3] if gzipped else fmt
+
+    # 生成器逐块输出，内存占用与导出条数无关，下载可以立即开始
+    if base_fmt == 'csv':
+        body = _iter_csv(data, fields or EXPORT_FIELDS)
+        mimetype, filename = 'text/csv; charset=utf-8', 'news.csv'
+    elif base_fmt == 'ndjson':
+        body = _iter_ndjson(data, fields, app.config.get('JSON_AS_ASCII', True))
+        mimetype, filename = 'application/x-ndjson; charset=utf-8', 'news.ndjson'
     else:
-        data = filter_news(get_news_with_cache(website, force_refresh=refresh), search_text)
+        body = _iter_json_array(data, fields, app.config.get('JSON_AS_ASCII', True))
+        mimetype, filename = 'application/json', None
+        gzipped = False
+
+    if gzipped:
+        resp = Response(_iter_gzip(body), mimetype='application/gzip')
+        filename += '.gz'
+    else:
+        resp = Response(body, mimetype=mimetype)
+    if filename:
+        resp.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return _with_validators(resp, *validators) if validators else resp
+
+# 导出：默认字段与每次输出的块大小
+EXPORT_FIELDS = ['title', 'link', 'source', 'date']
+EXPORT_CHUNK_CHARS = 64 * 1024
+
+def _project(row, fields):
+    if not fields:
+        return row
+    return {field: row.get(field, '') for field in fields}
+
+def _iter_chunks(pieces):
+    """把小片段攒成约 EXPORT_CHUNK_CHARS 大小的块再输出"""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= EXPORT_CHUNK_CHARS:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
 
-    if fmt == 'csv':
-        output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=['title', 'link', 'source', 'date'])
+def _iter_csv(data, fields):
+    def rows():
+        line = io.StringIO()
+        writer = csv.DictWriter(line, fieldnames=fields)
         writer.writeheader()
         for row in data:
-            writer.writerow({
-                'title': row.get('title', ''),
-                'link': row.get('link', ''),
-                'source': row.get('source', ''),
-                'date': row.get('date', ''),
-            })
-        resp = Response(output.getvalue(), mimetype='text/csv; charset=utf-8')
-        resp.headers['Content-Disposition'] = 'attachment; filename="news.csv"'
-        return resp
-    else:
-        return jsonify(data)
+            writer.writerow({field: row.get(field, '') for field in fields})
+            yield line.getvalue()
+            line.seek(0)
+            line.truncate(0)
+        yield line.getvalue()
+    return _iter_chunks(rows())
+
+def _iter_ndjson(data, fields, ensure_ascii=True):
+    return _iter_chunks(
+        json.dumps(_project(row, fields), ensure_ascii=ensure_ascii, sort_keys=True, separators=(',', ':')) + '\n'
+        for row in data
+    )
+
+def _iter_json_array(data, fields, ensure_ascii=True):
+    """与 jsonify 输出格式一致的JSON数组，按块流式输出"""
+    def pieces():
+        yield '['
+        for i, row in enumerate(data):
+            if i:
+                yield ','
+            yield json.dumps(_project(row, fields), ensure_ascii=ensure_ascii, sort_keys=True, separators=(',', ':'))
+        yield ']\n'
+    return _iter_chunks(pieces())
+
+def _iter_gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31：gzip格式
+    for chunk in chunks:
+        packed = compressor.compress(chunk.encode('utf-8'))
+        if packed:
+            yield packed
+    yield compressor.flush()
 
 @app.route('/feed.xml')
 def rss_feed():
@@ -561,36 +591,19 @@ def rss_feed():
     sources_str = request.args.get('sources', '').strip()
     selected_sources = [s for s in [x.strip() for x in sources_str.split(',')] if s] if sources_str else []
 
-    # 数据获取与筛选（复用现有逻辑）
-    if selected_sources:
-        valid_sources = [s for s in selected_sources if s in websites]
-        aggregated = []
-        for site in valid_sources:
-            aggregated.extend(get_news_with_cache(site, force_refresh=refresh))
-        seen = set()
-        deduped = []
-        for item in aggregated:
-            link = item.get('link')
-            if link and link not in seen:
-                seen.add(link)
-                deduped.append(item)
-        deduped.sort(key=lambda x: x.get('date', ''), reverse=True)
-        data = filter_news(deduped, search_text)
-    elif website == ALL_SOURCES_LABEL:
-        aggregated = []
-        for site in websites.keys():
-            aggregated.extend(get_news_with_cache(site, force_refresh=refresh))
-        seen = set()
-        deduped = []
-        for item in aggregated:
-            link = item.get('link')
-            if link and link not in seen:
-                seen.add(link)
-                deduped.append(item)
-        deduped.sort(key=lambda x: x.get('date', ''), reverse=True)
-        data = filter_news(deduped, search_text)
+    # 数据获取与筛选（复用现有逻辑）；订阅器轮询时数据未变化直接返回304
+    sites = resolve_sources(website, selected_sources)
+    date_from, date_to = _date_range_args()
+    entries = load_news_sources(sites, force_refresh=refresh)
+    if _use_archive(search_text, date_from, date_to):
+        data, _ = _archive.query(sites, search_text, date_from, date_to, limit=50)
+        validators = None
     else:
-        data = filter_news(get_news_with_cache(website, force_refresh=refresh), search_text)
+        validators = _news_validators(sites, entries)
+        not_modified = _not_modified_response(*validators)
+        if not_modified is not None:
+            return not_modified
+        data = _filter_date_range(get_news_view(sites, search_text, entries=entries), date_from, date_to)
 
     # 生成 RSS 2.0
     base = request.url_root.rstrip('/')
@@ -619,27 +632,465 @@ def rss_feed():
   </channel>
 </rss>
 """
-    return Response(rss, mimetype='application/rss+xml; charset=utf-8')
+    resp = Response(rss, mimetype='application/rss+xml; charset=utf-8')
+    return _with_validators(resp, *validators) if validators else resp
+
+# --- HTTP 条件响应 ---
+def _news_validators(sites, entries):
+    """由各来源的内容哈希与查询参数计算强ETag，Last-Modified 取内容最近一次变化的时间"""
+    digest = hashlib.sha1()
+    digest.update(request.path.encode('utf-8'))
+    digest.update(request.url_root.encode('utf-8'))
+    for site, entry in zip(sites, entries):
+        stamp = entry.get('digest') or f"{entry['version']}:{entry['ts']}" if entry else '-'
+        digest.update(f"|{site}={stamp}".encode('utf-8'))
+    # refresh 与 key 不影响响应内容
+    params = sorted((k, v) for k, v in request.args.items(multi=True) if k not in ('refresh', 'key'))
+    digest.update(json.dumps(params, ensure_ascii=False).encode('utf-8'))
+    timestamps = [entry.get('modified', entry['ts']) for entry in entries if entry]
+    last_modified = None
+    if timestamps:
+        last_modified = datetime.fromtimestamp(int(max(timestamps)), timezone.utc)
+    return digest.hexdigest(), last_modified
+
+def _not_modified_response(etag, last_modified):
+    """客户端缓存仍有效时返回304响应，否则返回 None（If-None-Match 优先于 If-Modified-Since）"""
+    if request.if_none_match:
+        fresh = request.if_none_match.contains(etag)
+    elif request.if_modified_since and last_modified:
+        fresh = last_modified <= request.if_modified_since
+    else:
+        fresh = False
+    if not fresh:
+        return None
+    return _with_validators(Response(status=304), etag, last_modified)
+
+def _with_validators(resp, etag, last_modified):
+    resp.set_etag(etag)
+    if last_modified:
+        resp.last_modified = last_modified
+    resp.headers['Cache-Control'] = f'public, max-age={CACHE_TTL_SECONDS}, must-revalidate'
+    return resp
+
+def resolve_sources(website, selected_sources):
+    """把请求参数解析为有效来源列表：多来源选择 > 全部来源 > 单个网站"""
+    if selected_sources:
+        return [s for s in selected_sources if s in websites]
+    if website == ALL_SOURCES_LABEL:
+        return list(websites.keys())
+    return [website] if website in websites else []
+
+def _date_range_args():
+    """请求中的日期范围 (date_from, date_to)，均为含当天的 YYYY-MM-DD；缺省或格式不对时为 None"""
+    return archive.valid_date(request.args.get('date_from')), archive.valid_date(request.args.get('date_to'))
+
+def _use_archive(search_text, date_from, date_to):
+    """启用归档时，带日期范围、游标或可用全文索引检索的搜索词的请求从归档查询；
+    搜索词只含标点等无法索引的字符时仍用内存视图，避免在归档中逐行扫描"""
+    if _archive is None:
+        return False
+    if date_from or date_to or request.args.get('cursor'):
+        return True
+    return bool(archive.query_tokens((search_text or '').lower().split()))
+
+def get_request_view(sites, search_text, date_from, date_to, force_refresh=False):
+    """首页与详情页共用的新闻视图：归档查询（最多 ARCHIVE_VIEW_LIMIT 条）或内存视图按日期范围筛选"""
+    if _use_archive(search_text, date_from, date_to):
+        # 仍触发来源的抓取与刷新，新数据经 _store_news 写入归档
+        load_news_sources(sites, force_refresh=force_refresh)
+        rows, _ = _archive.query(sites, search_text, date_from, date_to, limit=ARCHIVE_VIEW_LIMIT)
+        return NewsView(rows)
+    return _filter_date_range(get_news_view(sites, search_text, force_refresh=force_refresh), date_from, date_to)
+
+def _filter_date_range(view, date_from, date_to):
+    """内存视图按日期范围（闭区间）筛选；首页、/fetch_news、/export 与 /feed.xml 未用归档时共用"""
+    if not (date_from or date_to):
+        return view
+    return NewsView(item for item in view if archive.in_date_range(item.get('date'), date_from, date_to))
+
+class NewsView(list):
+    """视图计算结果：在列表之外附带 链接 → 位置 索引与各页边界，
+    详情页的定位、页码与前后导航不再随列表长度线性增长"""
+
+    def __init__(self, items=()):
+        super().__init__(items)
+        self.link_index = {}
+        for i, item in enumerate(self):
+            link = item.get('link')
+            if link and link not in self.link_index:
+                self.link_index[link] = i
+        self._page_bounds = {}  # page_size -> [(start, end), ...]
 
+    def position(self, link):
+        return self.link_index.get(link)
+
+    def page_bounds(self, page_size):
+        """按 page_size 计算一次并缓存每页的 (start, end)；空列表也有一页"""
+        bounds = self._page_bounds.get(page_size)
+        if bounds is None:
+            bounds = [(start, min(start + page_size, len(self))) for start in range(0, len(self), page_size)]
+            bounds = bounds or [(0, 0)]
+            self._page_bounds[page_size] = bounds
+        return bounds
+
+    def page_of(self, index, page_size):
+        return index // page_size + 1
+
+    def neighbour_links(self, index):
+        """返回 (上一条链接, 下一条链接)，不存在时为 None"""
+        prev_link = self[index - 1]['link'] if index > 0 else None
+        next_link = self[index + 1]['link'] if index + 1 < len(self) else None
+        return prev_link, next_link
+
+def load_news_sources(sites, force_refresh=False):
+    """触发抓取/后台刷新，并返回各来源当前的缓存条目（不存在时为 None）"""
+    get_news_for_sites(sites, force_refresh=force_refresh)
+    with _cache_lock:
+        return [_cache.get(site) for site in sites]
+
+def get_news_view(sites, search_text='', force_refresh=False, entries=None):
+    """聚合 → 按链接去重 → 按日期排序 → filter_news 的统一入口。
+
+    结果按 (来源元组, 搜索词) 缓存，只有当某个来源写入了新数据（版本号变化）时才重新计算，
+    因此翻页、JSON接口与RSS可以复用同一份结果。返回的列表为共享数据，调用方不要修改。
+    已调用过 load_news_sources 的路由可通过 entries 传入其结果，避免重复读取。
+    """
+    # 实际数据与版本号统一从缓存读取
+    if entries is None:
+        entries = load_news_sources(sites, force_refresh=force_refresh)
+    versions = tuple(entry["version"] if entry else 0 for entry in entries)
+
+    key = (tuple(sites), search_text)
+    with _views_lock:
+        view = _views.get(key)
+        if view and view['versions'] == versions:
+            _views.move_to_end(key)
+            _view_stats['hits'] += 1
+            return view['data']
+        _view_stats['misses'] += 1
+
+    query = parse_query(search_text or '')
+    if query:
+        # 有搜索词时先查各来源的倒排索引，只对命中的条目做归并、过滤与排序
+        lists = [_search_entry(entry, query) if entry else [] for entry in entries]
+    else:
+        lists = [entry["data"] if entry else [] for entry in entries]
+    merged = _merge_sources(lists)
+    data = NewsView(filter_news(merged, search_text))
+
+    with _views_lock:
+        _views[key] = {'versions': versions, 'data': data}
+        _views.move_to_end(key)
+        while len(_views) > VIEW_CACHE_MAX_ENTRIES:
+            _views.popitem(last=False)
+    return data
+
+def _search_entry(entry, query):
+    """在来源缓存条目的倒排索引中查询（缺少索引时补建）"""
+    index = entry.get("index")
+    if index is None:
+        index = entry["index"] = SearchIndex(entry["data"])
+    return index.search(query)
+
+def _merge_sources(lists):
+    """k路归并各来源列表（fetch_news 已按日期倒序）并按链接去重，保留先出现的条目"""
+    if len(lists) == 1:
+        merged = lists[0]
+    else:
+        merged = heapq.merge(*lists, key=lambda x: x.get('date', ''), reverse=True)
+    seen = set()
+    deduped = []
+    for item in merged:
+        link = item.get('link')
+        if link and link not in seen:
+            seen.add(link)
+            deduped.append(item)
+    return deduped
+
+def get_news_for_sites(sites, force_refresh=False, deadline=None):
+    """并发获取多个来源的新闻并按来源顺序拼接。
+
+    所有来源同时抓取，整体受 deadline（秒）约束；超时未返回的来源使用其最近一次缓存的数据，
+    聚合页的耗时由最慢的来源决定，而不是各来源之和。
+    """
+    if not sites:
+        return []
+    # 工作线程中没有请求上下文，这里先解析URL中的强制刷新参数
+    if has_request_context() and request.args.get('refresh') == 'true':
+        force_refresh = True
+    if len(sites) == 1:
+        return list(get_news_with_cache(sites[0], force_refresh=force_refresh))
+    if deadline is None:
+        deadline = AGGREGATE_DEADLINE_SECONDS
+
+    t0 = time.time()
+    futures = {
+        site: tracing.submit(_fetch_executor, get_news_with_cache, site, force_refresh)
+        for site in sites
+    }
+    wait(list(futures.values()), timeout=deadline)
+
+    aggregated = []
+    for site, future in futures.items():
+        if future.done() and not future.exception():
+            aggregated.extend(future.result())
+            continue
+        if future.done():
+            logger.error(f"并发抓取 {site} 失败: {future.exception()}")
+        else:
+            logger.warning(f"并发抓取 {site} 超过截止时间 {deadline}s，使用缓存数据")
+        with _cache_lock:
+            cache_entry = _cache.get(site)
+        if cache_entry:
+            aggregated.extend(cache_entry["data"])
+
+    with _cache_lock:
+        _metrics['last_fetch']['聚合'] = {
+            'ts': int(t0),
+            'duration_ms': int((time.time() - t0) * 1000),
+            'count': len(aggregated),
+        }
+    return aggregated
+
+class _Flight:
+    """一次正在进行的抓取，后到的调用方等待其结果"""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+def _single_flight(key, fn):
+    """同一 key 同时只执行一次 fn，并发调用方共享这次执行的结果或异常"""
+    with _cache_lock:
+        flight = _inflight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _Flight()
+            _inflight[key] = flight
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+    try:
+        flight.result = fn()
+        return flight.result
+    except Exception as exc:
+        flight.error = exc
+        raise
+    finally:
+        with _cache_lock:
+            _inflight.pop(key, None)
+        flight.done.set()
+
+def _backend_call(method, *args, default=None):
+    """调用缓存后端；失败时记录错误并返回 default，调用方降级为只用本地缓存"""
+    try:
+        return method(*args)
+    except cache_backends.BackendError as exc:
+        _record_error('缓存后端', method.__name__, str(exc))
+        return default
+
+def _shared_flight(name, produce, lookup):
+    """跨进程的 single-flight：拿到后端锁的进程执行 produce()；其余进程轮询 lookup() 等待它的结果，
+    锁被释放后自己接手，等待超过 CACHE_LOCK_WAIT_S 或后端不可用时不加锁执行"""
+    token = _backend_call(_backend.acquire_lock, name, CACHE_LOCK_TTL_S, default='')
+    deadline = time.time() + CACHE_LOCK_WAIT_S
+    while token is None and time.time() < deadline:
+        time.sleep(CACHE_LOCK_POLL_S)
+        result = lookup()
+        if result is not None:
+            return result
+        token = _backend_call(_backend.acquire_lock, name, CACHE_LOCK_TTL_S, default='')
+    if not token:
+        return produce()
+    try:
+        return produce()
+    finally:
+        _backend_call(_backend.release_lock, name, token)
+
+def _news_key(website):
+    return 'news:' + website
+
+def _publish_news(website, entry):
+    """把来源数据写入共享后端（进程内后端无需写入）"""
+    if not _backend.shared:
+        return
+    blob = json.dumps({key: entry[key] for key in ('data', 'ts', 'modified', 'digest')}, ensure_ascii=False)
+    _backend_call(_backend.set, _news_key(website), blob.encode('utf-8'), SHARED_NEWS_TTL_SECONDS)
+
+def _sync_shared_news(website):
+    """共享后端中有比本地更新的来源数据时写入本地缓存（内容相同则沿用版本号与索引）；返回本地条目"""
+    with _cache_lock:
+        current = _cache.get(website)
+    if not _backend.shared:
+        return current
+    blob = _backend_call(_backend.get, _news_key(website))
+    if blob is None:
+        return current
+    try:
+        saved = json.loads(blob)
+    except ValueError:
+        return current
+    if current and current['ts'] >= saved['ts']:
+        return current
+    if current and current.get('digest') == saved['digest']:
+        entry = dict(current, ts=saved['ts'], modified=saved['modified'])
+        entry.pop('restored', None)
+    else:
+        # 锁外构建搜索索引
+        entry = dict(saved, version=next(_cache_versions), index=SearchIndex(saved['data']))
+    with _cache_lock:
+        latest = _cache.get(website)
+        if latest is not None and latest['ts'] >= entry['ts']:
+            return latest
+        _cache[website] = entry
+    return entry
+
+@tracing.traced('get_news_with_cache', detail_arg=0)
 def get_news_with_cache(website, force_refresh=False):
+    _snapshot.ensure_loaded()
     # 支持URL参数强制刷新
-    if request.args.get('refresh') == 'true':
+    if has_request_context() and request.args.get('refresh') == 'true':
         force_refresh = True
     now = time.time()
-    cache_entry = _cache.get(website)
+    if _backend.shared and not force_refresh:
+        with _cache_lock:
+            cache_entry = _cache.get(website)
+        if cache_entry is None or now - cache_entry["ts"] >= CACHE_TTL_SECONDS:
+            # 本地缺失或过期时，先取其他进程已抓取到的更新数据
+            _sync_shared_news(website)
+    with _cache_lock:
+        cache_entry = _cache.get(website)
+        age = now - cache_entry["ts"] if cache_entry else None
+        if not force_refresh and cache_entry and age < CACHE_TTL_SECONDS:
+            _count_cache(website, 'fresh_hits')
+            return cache_entry["data"]
+        # 软过期：先返回旧数据，同时在后台刷新（已有抓取在进行时不重复提交）；
+        # 启用调度时由调度器负责刷新，请求只读取已有数据（无论新旧）
+        # 从快照恢复、尚未刷新过的条目即使已硬过期也先返回，冷启动的请求不必等待抓取
+        scheduled = scheduler.SCHEDULER_MODE != 'off'
+        stale = bool(not force_refresh and cache_entry and
+                     (scheduled or age < CACHE_HARD_TTL_SECONDS or cache_entry.get('restored')))
+        revalidate = stale and not scheduled and website not in _inflight
+        if stale:
+            _count_cache(website, 'stale_hits')
+            if revalidate:
+                _count_cache(website, 'background_refreshes')
+        else:
+            _count_cache(website, 'misses')
+    if stale:
+        if revalidate:
+            _fetch_executor.submit(_revalidate_news, website)
+        return cache_entry["data"]
+    # 同一来源的并发请求合并为一次上游抓取
+    return _single_flight(website, lambda: _refresh_news(website, force_refresh))
+
+def _revalidate_news(website):
+    """后台刷新软过期的来源；失败时保留旧数据"""
+    try:
+        _single_flight(website, lambda: _refresh_news(website))
+    except Exception as e:
+        logger.error(f"后台刷新 {website} 失败: {str(e)}")
+
+def _record_error(website, stage, message):
+    """写入错误环形缓冲并累加该来源、阶段的错误次数"""
+    with _errors_lock:
+        _errors.append({
+            'ts': int(time.time()),
+            'website': website,
+            'stage': stage,
+            'message': message,
+        })
+        stages = _error_counts.setdefault(website, {})
+        stages[stage] = stages.get(stage, 0) + 1
+
+def _count_cache(website, field):
+    """累加缓存命中计数（调用方需持有 _cache_lock）"""
+    stats = _metrics['cache'].setdefault(website, {
+        'fresh_hits': 0, 'stale_hits': 0, 'misses': 0, 'background_refreshes': 0,
+    })
+    stats[field] += 1
+    instrumentation.CACHE_REQUESTS.inc(source=website, result=field)
+
+def _cache_status(website, now=None):
+    """缓存年龄与状态：fresh / stale（后台重验证中）/ expired / empty"""
+    now = now or time.time()
+    with _cache_lock:
+        cache_entry = _cache.get(website)
+        refreshing = website in _inflight
+    if not cache_entry:
+        return {'state': 'empty', 'age_s': 0, 'refreshing': refreshing}
+    age = now - cache_entry["ts"]
+    if age < CACHE_TTL_SECONDS:
+        state = 'fresh'
+    elif age < CACHE_HARD_TTL_SECONDS:
+        state = 'stale'
+    else:
+        state = 'expired'
+    return {'state': state, 'age_s': int(age), 'refreshing': refreshing}
+
+def _refresh_news(website, force_refresh=False):
+    """抓取单个来源并写入缓存（由 _single_flight 保证同一来源只有一个在执行）"""
+    now = time.time()
+    # 等待锁期间可能已有其他抓取（本进程或其他进程）刚刚完成
+    cache_entry = _sync_shared_news(website)
     if not force_refresh and cache_entry and (now - cache_entry["ts"]) < CACHE_TTL_SECONDS:
         return cache_entry["data"]
-    t0 = time.time()
-    data = fetch_news(website)
-    t1 = time.time()
-    _cache[website] = {"data": data, "ts": now}
-    # 记录指标
-    _metrics['last_fetch'][website] = {
-        'ts': int(now),
-        'duration_ms': int((t1 - t0) * 1000),
-        'count': len(data),
-    }
-    return data
+    previous_ts = cache_entry["ts"] if cache_entry else 0
+
+    def crawl():
+        t0 = time.time()
+        data = fetch_news(website)
+        return _store_news(website, data, t0, time.time())
+
+    def crawled_elsewhere():
+        entry = _sync_shared_news(website)
+        return entry["data"] if entry and entry["ts"] > previous_ts else None
+
+    # 多个 worker 进程中同一来源同时只有一个在抓取，其余等待并读取它的结果
+    return _shared_flight(_news_key(website), crawl, crawled_elsewhere)
+
+def _store_news(website, data, t0, t1):
+    """写入一次抓取结果；空结果保留旧数据，内容未变化时沿用原版本号与索引"""
+    now = t0
+    digest = hashlib.sha1(json.dumps(data, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+    with _cache_lock:
+        previous = _cache.get(website)
+    if not data and previous and previous["data"]:
+        # 抓取失败（空结果）时保留旧数据，下次请求会再次触发刷新
+        logger.warning(f"{website} 抓取结果为空，继续使用缓存数据")
+        return previous["data"]
+    if previous and previous.get("digest") == digest:
+        # 内容未变化：沿用原版本号与索引，依赖它的视图和ETag继续有效
+        entry = dict(previous, ts=now)
+        entry.pop('restored', None)
+    else:
+        # 来源刷新时构建搜索索引（锁外构建，避免阻塞其他读者）
+        entry = {"data": data, "ts": now, "modified": now, "digest": digest,
+                 "version": next(_cache_versions), "index": SearchIndex(data)}
+        _archive_write(website, lambda: _archive.add_items(
+            [item for item in data if item.get('link') not in INVALID_NEWS_LINKS]))
+    with _cache_lock:
+        _cache[website] = entry
+        # 记录指标
+        _metrics['last_fetch'][website] = {
+            'ts': int(now),
+            'duration_ms': int((t1 - t0) * 1000),
+            'count': len(data),
+        }
+    _publish_news(website, entry)
+    _snapshot.mark_dirty()
+    return entry["data"]
+
+def _archive_write(website, write):
+    """写入归档；未启用时跳过，写入失败只记录错误，不影响抓取结果"""
+    if _archive is None:
+        return
+    try:
+        write()
+    except sqlite3.Error as exc:
+        _record_error(website, 'archive', str(exc))
 
 def get_default_headers():
     return {
@@ -661,39 +1112,213 @@ def fetch_url(url, headers=None, timeout=10):
     PROXY_BASE 示例: https://your-worker-subdomain.workers.dev
     实际请求为: PROXY_BASE + '?url=' + urlencode(original_url)
     """
-    proxy_base = os.environ.get('PROXY_BASE', '').strip()
-    target = url
-    if proxy_base:
-        # 确保末尾没有多余斜杠，避免 //
-        proxy_base = proxy_base.rstrip('/')
-        target = f"{proxy_base}?url={quote_plus(url)}"
-    return requests.get(target, headers=headers, timeout=timeout)
-
-def fetch_url_with_retries(url, headers=None, timeout=10, retries=3):
-    last_exc = None
-    for attempt in range(retries):
-        try:
-            resp = fetch_url(url, headers=headers or get_default_headers(), timeout=timeout)
-            if resp.status_code == 200 and resp.text:
-                return resp
-            # 对于非常短的响应或临时错误，触发重试
-        except Exception as exc:
-            last_exc = exc
-        # 指数退避 + 轻微抖动
-        backoff_ms = (2 ** attempt) * 0.3 + random.uniform(0.05, 0.2)
-        time.sleep(backoff_ms)
-    # 最后一次尝试，直接抛出或返回占位响应
-    if last_exc:
-        raise last_exc
-    return fetch_url(url, headers=headers or get_default_headers(), timeout=timeout)
+    # 经传输层发送（默认即按主机共享的会话，复用 keep-alive 连接；也可录制/回放/注入故障）
+    return transport.get(url, headers=headers, timeout=timeout, target=transport.target_for(url))
+
+# 异步抓取引擎：列表页与正文页的请求、重试退避与候选URL对冲都在它的事件循环中调度
+_crawl_engine = crawl_engine.CrawlEngine(lambda url, headers, timeout: fetch_url(url, headers=headers, timeout=timeout))
+
+def _record_fallback(website, used_index, elapsed):
+    """记录候选URL的使用情况：首选成功、回退成功或全部失败，以及耗费在失败候选上的时间"""
+    with _cache_lock:
+        stats = _metrics['fallback'].setdefault(website, {
+            'primary_ok': 0, 'fallback_ok': 0, 'all_failed': 0, 'failed_candidates_s': 0.0,
+        })
+        if used_index is None:
+            outcome = 'all_failed'
+            stats['failed_candidates_s'] += elapsed
+        elif used_index == 0:
+            outcome = 'primary_ok'
+        else:
+            outcome = 'fallback_ok'
+            stats['failed_candidates_s'] += elapsed
+        stats[outcome] += 1
+    instrumentation.CRAWL_FALLBACK.inc(source=website, outcome=outcome)
+
+def _conditional_headers(url, headers):
+    """在请求头中附加该URL上次抓取的验证器（仅当有可复用的解析结果时）"""
+    with _validators_lock:
+        validators = _crawl_validators.get(url)
+    headers = dict(headers)
+    if validators and validators.get('items'):
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        # 默认头中的 no-cache 会让部分上游忽略条件请求
+        headers.pop('Cache-Control', None)
+    return headers
 
+def _reuse_validated_items(url, response):
+    """304 或正文哈希与上次一致时返回上次解析出的新闻列表（副本），否则返回 None"""
+    with _validators_lock:
+        validators = _crawl_validators.get(url)
+        if not validators or not validators.get('items'):
+            return None
+        if response.status_code == 304:
+            counter = 'not_modified'
+        elif validators.get('body_hash') and validators['body_hash'] == hashlib.sha1(response.content).hexdigest():
+            counter = 'unchanged_body'
+            validators['etag'] = response.headers.get('ETag') or validators.get('etag')
+            validators['last_modified'] = response.headers.get('Last-Modified') or validators.get('last_modified')
+        else:
+            return None
+        items = [dict(item) for item in validators['items']]
+    with _cache_lock:
+        _metrics['conditional'][counter] += 1
+    return items
+
+def _remember_validators(url, response, items):
+    """记录成功解析的列表页的验证器与结果，供下次条件请求使用"""
+    with _validators_lock:
+        _crawl_validators[url] = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'body_hash': hashlib.sha1(response.content).hexdigest(),
+            'items': [dict(item) for item in items],
+        }
+    with _cache_lock:
+        _metrics['conditional']['parsed'] += 1
+
+@tracing.traced('fetch_news', detail_arg=0)
 def fetch_news(website):
-    """获取选定网站的最新资讯"""
+    """获取选定网站的最新资讯（同步接口，经抓取引擎执行 fetch_news_async）"""
+    return _crawl_engine.run(fetch_news_async(website))
+
+async def fetch_news_async(website):
+    """fetch_news 的异步版本：候选URL对冲请求，解码与解析在线程池中进行"""
     website_config = websites.get(website)
     if not website_config:
         return []
     
-    url = website_config["url"]
+    try:
+        result = await _download_list_page(website, website_config)
+        if result is None:
+            logger.error("所有URL都失败 %s", website)
+            _record_error(website, 'fetch_list', '所有候选URL都失败')
+            return []
+        reused, response, response_url, html_text = result
+        if reused is not None:
+            # 列表页未变化：增量模式下没有新条目，返回现有历史
+            if INCREMENTAL_CRAWL:
+                return await asyncio.to_thread(_merge_history, website, []) or reused
+            return reused
+        seen = _seen_links_for(website) if INCREMENTAL_CRAWL else None
+        news_data = await asyncio.to_thread(_parse_news_list, website, website_config, html_text, seen)
+    except Exception as e:
+        error_msg = str(e)
+        logger.error("获取资讯失败 %s: %s", website, error_msg)
+        _record_error(website, 'fetch_news', error_msg)
+        # 返回空列表而不是崩溃
+        return []
+
+    # 合并历史与计算正文哈希都不在事件循环线程中进行
+    if INCREMENTAL_CRAWL:
+        news_data = await asyncio.to_thread(_merge_history, website, news_data)
+    if news_data and response_url:
+        await asyncio.to_thread(_remember_validators, response_url, response, news_data)
+    
+    logger.info("%s 返回 %d 条新闻", website, len(news_data))
+    return news_data
+
+def _seen_links_for(website):
+    """增量模式下无需再提取的链接；该来源没有历史（首次抓取或缓存已清空）时为空，做一次完整提取"""
+    with _cache_lock:
+        has_history = bool(_cache.get(website, {}).get("data"))
+        return set(_seen_links.get(website, ())) if has_history else set()
+
+def _merge_history(website, new_items):
+    """把新条目并入该来源的滚动历史（即缓存中的列表）：按日期倒序，超出条数上限或时间窗口的旧条目被丢弃"""
+    with _cache_lock:
+        entry = _cache.get(website)
+    history = entry["data"] if entry else []
+    new_links = {item['link'] for item in new_items}
+    merged = list(new_items) + [item for item in history if item['link'] not in new_links]
+    merged.sort(key=lambda x: x['date'], reverse=True)
+    if HISTORY_MAX_DAYS > 0:
+        cutoff = (datetime.now() - timedelta(days=HISTORY_MAX_DAYS)).strftime('%Y-%m-%d')
+        merged = [item for item in merged if str(item.get('date', '')) >= cutoff]
+    merged = merged[:HISTORY_MAX_ITEMS]
+    with _cache_lock:
+        seen = _seen_links.setdefault(website, OrderedDict())
+        for link in new_links:
+            seen[link] = None
+            seen.move_to_end(link)
+        # 只保留最近的若干链接，避免无限增长；被挤出的链接若仍在列表页上，会被当作新链接重新提取
+        while len(seen) > HISTORY_MAX_ITEMS * 4:
+            seen.popitem(last=False)
+        _metrics['incremental'][website] = {
+            'new_items': len(new_items),
+            'history': len(merged),
+            'seen_links': len(seen),
+        }
+    return merged
+
+def _list_candidates(website, url):
+    """列表页候选URL（对中国旅游新闻网增加回退URL以提升成功率）"""
+    candidate_urls = [url]
+    if website == "中国旅游新闻网":
+        candidate_urls.extend([
+            "https://www.ctnews.com.cn/jujiao/",  # 栏目页
+            "https://www.ctnews.com.cn/",         # 首页
+        ])
+    return candidate_urls
+
+def _check_list_response(website, website_config, cand, response):
+    """检查候选URL的响应：返回 (复用的新闻列表, 解码后的正文)，前者非空时无需解析"""
+    # 内容未变化（304 或正文哈希相同）时跳过解析，直接复用上次结果
+    reused = _reuse_validated_items(cand, response)
+    if reused is not None:
+        logger.info(f"{website} 列表页未变化 ({cand})，复用 {len(reused)} 条新闻")
+        return reused, None
+    html_text = ''
+    if response.status_code == 200:
+        with instrumentation.stage('decode', website):
+            resolve_encoding(response, url=cand, hint=website_config.get("encoding"))
+            # response.text 每次访问都会重新解码，这里只解码一次
+            html_text = response.text
+    return None, html_text
+
+async def _download_list_page(website, website_config):
+    """请求列表页：返回 (复用的新闻列表, 响应, 响应URL, 正文)，全部候选都不可用时返回 None。
+
+    前一个候选失败或过慢时才启动下一个（见 CrawlEngine.first_success），首选仍可能成功时优先用首选的结果；
+    都不满足长度要求时，与原先逐个尝试时一样使用最后一个候选返回的正文。
+    """
+    # 设置请求头，模拟浏览器
+    headers = get_default_headers()
+    candidate_urls = _list_candidates(website, website_config["url"])
+    candidates_started = time.time()
+    started = {}
+    short_pages = {}  # 下标 -> 返回了200但正文过短的结果
+
+    async def attempt(index, cand):
+        started[index] = time.time()
+        try:
+            response = await _crawl_engine.fetch(cand, headers=_conditional_headers(cand, headers), timeout=10, retries=3)
+            reused, html_text = await asyncio.to_thread(_check_list_response, website, website_config, cand, response)
+        except Exception as e:
+            logger.warning("抓取异常 %s 从 %s: %s", website, cand, e)
+            return None
+        if reused is not None:
+            return reused, response, cand, None
+        if html_text and len(html_text) > 1000:
+            logger.debug("成功抓取 %s 从 %s, 内容长度: %d", website, cand, len(html_text))
+            return None, response, cand, html_text
+        if html_text:
+            short_pages[index] = (None, response, cand, html_text)
+        logger.warning("抓取失败 %s 从 %s, 状态码: %s", website, cand, response.status_code)
+        return None
+
+    used_index, result = await _crawl_engine.first_success(candidate_urls, attempt)
+    _record_fallback(website, used_index,
+                     (started[used_index] if used_index is not None else time.time()) - candidates_started)
+    if result is None:
+        result = short_pages.get(len(candidate_urls) - 1)
+    return result
+
+def _parse_news_list(website, website_config, html_text, seen=None):
+    """从列表页正文中提取新闻列表（按日期倒序）；seen 为增量模式下已抓取过、无需再提取的链接"""
     link_css = website_config["link_css"]  # 使用CSS选择器替代XPath
     base_url = website_config["base_url"]
     
@@ -701,299 +1326,237 @@ def fetch_news(website):
     processed_links = set()
     news_data = []
     
-    try:
-        # 设置请求头，模拟浏览器
-        headers = get_default_headers()
-        
-        # 发送请求（对中国旅游新闻网增加回退URL以提升成功率）
-        candidate_urls = [url]
-        if website == "中国旅游新闻网":
-            candidate_urls.extend([
-                "https://www.ctnews.com.cn/jujiao/",  # 栏目页
-                "https://www.ctnews.com.cn/",         # 首页
-            ])
-        response = None
-        for cand in candidate_urls:
-            try:
-                response = fetch_url_with_retries(cand, headers=headers, timeout=10, retries=3)
-                if response and response.status_code == 200 and response.text and len(response.text) > 1000:
-                    print(f"成功抓取 {website} 从 {cand}, 内容长度: {len(response.text)}")
-                    break
-                else:
-                    print(f"抓取失败 {website} 从 {cand}, 状态码: {response.status_code if response else 'None'}")
-            except Exception as e:
-                print(f"抓取异常 {website} 从 {cand}: {str(e)}")
-                response = None
-                continue
-        if response is None:
-            print(f"所有URL都失败 {website}")
-            return []
+    # 获取标题和链接 - 支持单个选择器或选择器列表
+    selectors = []
+    if isinstance(link_css, list):
+        selectors.extend(link_css)
+    else:
+        selectors.append(link_css)
+
+    # 根据站点追加备用选择器以提升成功率
+    if website == "人民网旅游频道":
+        selectors.extend([
+            'a[href*="/n1/"]',
+            'div.ej_list_box a',
+            'div.box a',
+            'div.list_box a',
+        ])
+    if website == "中国旅游新闻网":
+        selectors.extend([
+            'a[href*="/content/"]',
+            'div.list a[href*="/content/"]',
+            'div.article-list a[href*="/content/"]',
+            'ul li a[href*="/content/"]',
+            'section a[href*="/content/"]',
+        ])
+
+    # 一次遍历匹配全部选择器，只为命中的 <a> 建节点；不支持的选择器由 BeautifulSoup 兜底
+    with instrumentation.stage('parse', website):
+        page = parse_list_page(html_text, selectors)
+    select_started = time.perf_counter()
+    news_items = []
+    for css in selectors:
+        try:
+            css_links = page.select(css)
+            if css_links:
+                logger.debug("选择器 %s 匹配到 %d 个链接", css, len(css_links))
+                news_items.extend(css_links)
+            else:
+                logger.debug("选择器 %s 未匹配到链接", css)
+        except Exception as e:
+            logger.warning("选择器 %s 异常: %s", css, e)
+            continue
+    
+    instrumentation.CRAWL_STAGE_SECONDS.observe(time.perf_counter() - select_started, stage='select', source=website)
+    logger.debug("%s 总共找到 %d 个链接元素", website, len(news_items))
+    
+    # 去重处理，优先保留有文本内容的链接
+    seen_hrefs = {}
+    for item in news_items:
+        href = item.get('href', '')
+        if href:
+            text = item.text.strip() if item.text else ""
+            # 如果这个链接还没有记录，或者新链接有文本而旧链接没有文本
+            if href not in seen_hrefs or (text and not seen_hrefs[href].text.strip()):
+                seen_hrefs[href] = item
+    
+    news_items = list(seen_hrefs.values())
+    date_seconds = 0.0
+    
+    # 根据不同网站调整过滤策略
+    if website == "中国旅游新闻网":
+        filter_words = ['无标题', '详情', '视频', '图片', '更多', '相关', '推荐']
+    elif website == "环球网旅游频道":
+        filter_words = ['无标题', '详情', '视频', '图片', '更多', '相关', '推荐', '首页', '返回']
+    elif website == "人民网旅游频道":
+        filter_words = ['无标题', '详情', '视频', '图片', '更多', '相关', '推荐', '首页']
+    else:  # 其他网站
+        filter_words = ['无标题', '详情', '视频', '图片', '更多', '相关', '推荐', '首页']
+    
+    for item in news_items:
+        title = ""
+        link = ""
         
-        # 根据不同网站设置不同的编码策略
-        if website == "央广网文旅频道":
-            # 央广网可能使用GBK编码
-            try:
-                # 先尝试自动检测编码
-                response.encoding = response.apparent_encoding
-                
-                # 测试解码是否正常
-                test_content = response.text
-                # 如果有乱码特征，尝试GBK编码
-                if any(ch in test_content for ch in ['锟斤拷', '烫烫烫', '????']):
-                    response.encoding = "gbk"
-            except Exception:
-                response.encoding = "gbk"  # 默认为GBK
-        elif website == "中国旅游新闻网":
-            # 中国旅游新闻网使用UTF-8编码
-            response.encoding = "utf-8"
+        # 检查item的类型
+        if isinstance(item, str):
+            link = item.strip()
+            # 尝试从URL中提取标题信息
+            if link:
+                try:
+                    # 适配人民网的URL格式
+                    title_match = re.search(r'/(\d{4})/(\d{2})(\d{2})/([\w-]+)\.html', link)
+                    if title_match:
+                        title = title_match.group(4)  # 使用URL中的最后部分作为临时标题
+                except:
+                    pass
         else:
-            # 其他网站使用UTF-8或自动检测
-            response.encoding = response.apparent_encoding
-        
-        if response.status_code != 200:
-            return []
-        
-        # 解析HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
+            # 原有的元素节点处理逻辑
+            title = item.text.strip() if item.text else ""
+            
+            # 环球网特定的标题提取逻辑
+            if website == "环球网旅游频道" and not title:
+                # 尝试获取alt属性
+                title = item.get('alt', '').strip()
+                # 尝试获取title属性
+                if not title:
+                    title = item.get('title', '').strip()
+                # 尝试获取父元素的文本
+                if not title:
+                    parent = item.findparent()
+                    if parent and parent.text:
+                        title = parent.text.strip()
+                # 尝试获取兄弟元素的文本
+                if not title:
+                    next_sibling = item.getnext()
+                    if next_sibling and next_sibling.text:
+                        title = next_sibling.text.strip()
+                # 尝试获取子元素的文本
+                if not title:
+                    for child in item.iter():
+                        if child.text and len(child.text.strip()) > 0:
+                            title = child.text.strip()
+                            break
+            
+            link = item.get('href') if item.get('href') else ""
         
-        # 获取标题和链接 - 支持单个选择器或选择器列表
-        selectors = []
-        if isinstance(link_css, list):
-            selectors.extend(link_css)
-        else:
-            selectors.append(link_css)
-
-        # 根据站点追加备用选择器以提升成功率
-        if website == "人民网旅游频道":
-            selectors.extend([
-                'a[href*="/n1/"]',
-                'div.ej_list_box a',
-                'div.box a',
-                'div.list_box a',
-            ])
-        if website == "中国旅游新闻网":
-            selectors.extend([
-                'a[href*="/content/"]',
-                'div.list a[href*="/content/"]',
-                'div.article-list a[href*="/content/"]',
-                'ul li a[href*="/content/"]',
-                'section a[href*="/content/"]',
-            ])
-
-        news_items = []
-        for css in selectors:
-            try:
-                css_links = soup.select(css)
-                if css_links:
-                    print(f"选择器 {css} 匹配到 {len(css_links)} 个链接")
-                    news_items.extend(css_links)
-                else:
-                    print(f"选择器 {css} 未匹配到链接")
-            except Exception as e:
-                print(f"选择器 {css} 异常: {str(e)}")
-                continue
+        # 跳过无效标题和链接
+        if not title or len(title) < 5 or not link:
+            logger.debug("跳过无效项: 标题=%r, 链接=%r", title[:30], link[:50])
+            continue
         
-        print(f"总共找到 {len(news_items)} 个链接元素")
+        # 确保链接不是None
+        if link is None:
+            continue
         
-        # 去重处理，优先保留有文本内容的链接
-        seen_hrefs = {}
-        for item in news_items:
-            href = item.get('href', '')
-            if href:
-                text = item.text.strip() if item.text else ""
-                # 如果这个链接还没有记录，或者新链接有文本而旧链接没有文本
-                if href not in seen_hrefs or (text and not seen_hrefs[href].text.strip()):
-                    seen_hrefs[href] = item
+        # 将链接转换为字符串
+        link = str(link)
         
-        news_items = list(seen_hrefs.values())
+        # 清理链接中的特殊字符
+        link = link.strip()
         
-        # 根据不同网站调整过滤策略
-        if website == "中国旅游新闻网":
-            filter_words = ['无标题', '详情', '视频', '图片', '更多', '相关', '推荐']
-        elif website == "环球网旅游频道":
-            filter_words = ['无标题', '详情', '视频', '图片', '更多', '相关', '推荐', '首页', '返回']
-        elif website == "人民网旅游频道":
-            filter_words = ['无标题', '详情', '视频', '图片', '更多', '相关', '推荐', '首页']
-        else:  # 其他网站
-            filter_words = ['无标题', '详情', '视频', '图片', '更多', '相关', '推荐', '首页']
+        # 修复可能的重复base_url问题
+        try:
+            # 处理多种可能的重复格式
+            if isinstance(link, str) and isinstance(base_url, str) and link.startswith(base_url + base_url):
+                link = link.replace(base_url + base_url, base_url)
+            # 处理可能的双斜杠问题
+            if '//' in link and link.startswith('http'):
+                parts = link.split('//')
+                if len(parts) > 2:
+                    # 保留协议部分，合并后面的部分
+                    link = parts[0] + '//' + '/'.join(parts[1:])
+        except Exception:
+            pass
         
-        for item in news_items:
-            title = ""
-            link = ""
-            
-            # 检查item的类型
-            if isinstance(item, str):
-                link = item.strip()
-                # 尝试从URL中提取标题信息
-                if link:
-                    try:
-                        # 适配人民网的URL格式
-                        title_match = re.search(r'/(\d{4})/(\d{2})(\d{2})/([\w-]+)\.html', link)
-                        if title_match:
-                            title = title_match.group(4)  # 使用URL中的最后部分作为临时标题
-                    except:
-                        pass
-            else:
-                # 原有的元素节点处理逻辑
-                title = item.text.strip() if item.text else ""
-                
-                # 环球网特定的标题提取逻辑
-                if website == "环球网旅游频道" and not title:
-                    # 尝试获取alt属性
-                    title = item.get('alt', '').strip()
-                    # 尝试获取title属性
-                    if not title:
-                        title = item.get('title', '').strip()
-                    # 尝试获取父元素的文本
-                    if not title:
-                        parent = item.findparent()
-                        if parent and parent.text:
-                            title = parent.text.strip()
-                    # 尝试获取兄弟元素的文本
-                    if not title:
-                        next_sibling = item.getnext()
-                        if next_sibling and next_sibling.text:
-                            title = next_sibling.text.strip()
-                    # 尝试获取子元素的文本
-                    if not title:
-                        for child in item.iter():
-                            if child.text and len(child.text.strip()) > 0:
-                                title = child.text.strip()
-                                break
-                
-                link = item.get('href') if item.get('href') else ""
-            
-            # 跳过无效标题和链接
-            if not title or len(title) < 5 or not link:
-                print(f"跳过无效项: 标题='{title[:30]}', 链接='{link[:50]}'")
-                continue
-            
-            # 确保链接不是None
-            if link is None:
+        # 根据不同网站进行特定的链接过滤
+        if website == "央广网文旅频道":
+            # 央广网特定过滤
+            if "javascript" in link.lower() or "#" in link:
                 continue
+            # 检查是否为绝对链接，如果不是则添加基础URL
+            if not link.startswith('http'):
+                if link.startswith('/'):
+                    link = f"https://travel.cnr.cn{link}"
+                else:
+                    link = f"https://travel.cnr.cn/{link}"
+            # 修复双斜杠问题：只修复协议后的双斜杠，保留协议本身
+            if link.startswith('http'):
+                # 将协议后的双斜杠替换为单斜杠
+                protocol_end = link.find('//') + 2
+                protocol_part = link[:protocol_end]
+                path_part = link[protocol_end:]
+                # 修复路径中的双斜杠
+                path_part = path_part.replace('//', '/')
+                link = protocol_part + path_part
             
-            # 将链接转换为字符串
-            link = str(link)
-            
-            # 清理链接中的特殊字符
-            link = link.strip()
-            
-            # 修复可能的重复base_url问题
-            try:
-                # 处理多种可能的重复格式
-                if isinstance(link, str) and isinstance(base_url, str) and link.startswith(base_url + base_url):
-                    link = link.replace(base_url + base_url, base_url)
-                # 处理可能的双斜杠问题
-                if '//' in link and link.startswith('http'):
-                    parts = link.split('//')
-                    if len(parts) > 2:
-                        # 保留协议部分，合并后面的部分
-                        link = parts[0] + '//' + '/'.join(parts[1:])
-            except Exception:
-                pass
-            
-            # 根据不同网站进行特定的链接过滤
-            if website == "央广网文旅频道":
-                # 央广网特定过滤
-                if "javascript" in link.lower() or "#" in link:
-                    continue
-                # 检查是否为绝对链接，如果不是则添加基础URL
-                if not link.startswith('http'):
-                    if link.startswith('/'):
-                        link = f"https://travel.cnr.cn{link}"
-                    else:
-                        link = f"https://travel.cnr.cn/{link}"
-                # 修复双斜杠问题：只修复协议后的双斜杠，保留协议本身
-                if link.startswith('http'):
-                    # 将协议后的双斜杠替换为单斜杠
-                    protocol_end = link.find('//') + 2
-                    protocol_part = link[:protocol_end]
-                    path_part = link[protocol_end:]
-                    # 修复路径中的双斜杠
-                    path_part = path_part.replace('//', '/')
-                    link = protocol_part + path_part
-                
-                # 过滤明显无效的央广网链接模式（更精确的过滤）
-                invalid_cnr_patterns = [
-                    '/cnr_404/',      # 直接404页面
-                    '//cnr.cn/',      # 跨域链接
-                    '/2024zt/ai/',    # 特定的AI专题页面（已知404）
-                    '/news.cnr.cn/2024zt/',  # 跨域专题页面
-                    '/www.cnr.cn/2024zt/'    # 跨域专题页面
-                ]
-                
-                if any(pattern in link for pattern in invalid_cnr_patterns):
-                    print(f"过滤无效央广网链接: {link}")
-                    continue
-            elif website == "人民网旅游频道":
-                # 人民网旅游频道特定过滤
-                if "javascript" in link.lower() or "#" in link:
-                    continue
+            # 过滤明显无效的央广网链接模式（更精确的过滤）
+            invalid_cnr_patterns = [
+                '/cnr_404/',      # 直接404页面
+                '//cnr.cn/',      # 跨域链接
+                '/2024zt/ai/',    # 特定的AI专题页面（已知404）
+                '/news.cnr.cn/2024zt/',  # 跨域专题页面
+                '/www.cnr.cn/2024zt/'    # 跨域专题页面
+            ]
             
-            # 跳过包含过滤关键词的标题
-            if any(word in title for word in filter_words):
+            if any(pattern in link for pattern in invalid_cnr_patterns):
+                logger.debug("过滤无效央广网链接: %s", link)
                 continue
-            
-            # 确保链接是完整的
-            if not link.startswith('http'):
-                # 根据不同网站处理相对链接
-                if website == "中国旅游新闻网":
-                    link = f"https://www.ctnews.com.cn{link}"
-                elif website == "人民网旅游频道":
-                    # 人民网旅游频道相对链接处理
-                    if link.startswith('/'):
-                        link = f"http://travel.people.com.cn{link}"
-                    else:
-                        link = f"http://travel.people.com.cn/{link}"
-                else:  # 央广网文旅频道
-                      if link.startswith('/'):
-                          link = f"https://travel.cnr.cn{link}"
-                      else:
-                          link = f"https://travel.cnr.cn/{link}"
-            
-            # 检查链接是否已处理过（防止内容重复）
-            if link in processed_links:
+        elif website == "人民网旅游频道":
+            # 人民网旅游频道特定过滤
+            if "javascript" in link.lower() or "#" in link:
                 continue
-            
-            # 添加链接到已处理集合
-            processed_links.add(link)
-            
-            # 从链接中提取日期信息或设置默认日期
-            date_str = extract_date_from_link(link, website)
-            
-            # 保存新闻数据
-            news_data.append({
-                'title': title,
-                'link': link,
-                'source': website,
-                'date': date_str
-            })
-            
-            # 限制新闻数量，防止过多
-            if len(news_data) >= 50:
-                break
         
-        print(f"处理完成后得到 {len(news_data)} 条新闻")
+        # 跳过包含过滤关键词的标题
+        if any(word in title for word in filter_words):
+            continue
         
-    except Exception as e:
-        error_msg = str(e)
-        print(f"获取资讯失败: {error_msg}")
-        try:
-            _errors.append({
-                'ts': int(time.time()),
-                'website': website,
-                'stage': 'fetch_news',
-                'message': error_msg,
-            })
-        except Exception:
-            pass
-        # 返回空列表而不是崩溃
-        return []
+        # 确保链接是完整的
+        if not link.startswith('http'):
+            # 根据不同网站处理相对链接
+            if website == "中国旅游新闻网":
+                link = f"https://www.ctnews.com.cn{link}"
+            elif website == "人民网旅游频道":
+                # 人民网旅游频道相对链接处理
+                if link.startswith('/'):
+                    link = f"http://travel.people.com.cn{link}"
+                else:
+                    link = f"http://travel.people.com.cn/{link}"
+            else:  # 央广网文旅频道
+                  if link.startswith('/'):
+                      link = f"https://travel.cnr.cn{link}"
+                  else:
+                      link = f"https://travel.cnr.cn/{link}"
+        
+        # 检查链接是否已处理过（防止内容重复）；增量模式下跳过以前抓取过的链接
+        if link in processed_links or (seen and link in seen):
+            continue
+        
+        # 添加链接到已处理集合
+        processed_links.add(link)
+        
+        # 从链接中提取日期信息或设置默认日期
+        date_started = time.perf_counter()
+        date_str = extract_date_from_link(link, website)
+        date_seconds += time.perf_counter() - date_started
+        
+        # 保存新闻数据
+        news_data.append({
+            'title': title,
+            'link': link,
+            'source': website,
+            'date': date_str
+        })
+        
+        # 限制新闻数量，防止过多
+        if len(news_data) >= 50:
+            break
+    
+    # 日期提取按次调用很短，整页累计后记一次
+    instrumentation.CRAWL_STAGE_SECONDS.observe(date_seconds, stage='date_extract', source=website)
+    logger.debug("%s 处理完成后得到 %d 条新闻", website, len(news_data))
         
     # 按日期排序，最新的在前
     news_data.sort(key=lambda x: x['date'], reverse=True)
-    
-    print(f"最终返回 {len(news_data)} 条新闻")
     return news_data
 
 def extract_date_from_link(link, website):
@@ -1032,8 +1595,13 @@ def extract_date_from_link(link, website):
         # 出错时返回当前日期
         return datetime.now().strftime('%Y-%m-%d')
 
+@tracing.traced('get_news_content', detail_arg=1)
 def get_news_content(link, website):
-    """获取新闻的详细内容"""
+    """获取新闻的详细内容（同步接口，经抓取引擎执行 get_news_content_async）"""
+    return _crawl_engine.run(get_news_content_async(link, website))
+
+async def get_news_content_async(link, website):
+    """get_news_content 的异步版本：请求经抓取引擎，解码与正文提取在线程池中进行"""
     try:
         # 验证链接格式，过滤无效链接
         if not link or not isinstance(link, str) or len(link.strip()) < 10:
@@ -1060,7 +1628,7 @@ def get_news_content(link, website):
         }
         
         # 请求新闻详情页
-        response = fetch_url_with_retries(link, headers=headers, timeout=10, retries=3)
+        response = await _crawl_engine.fetch(link, headers=headers, timeout=10, retries=3)
         
         # 检查响应状态，过滤404等错误页面
         if response.status_code != 200:
@@ -1069,122 +1637,230 @@ def get_news_content(link, website):
             elif response.status_code >= 400:
                 return f"页面访问失败({response.status_code})"
         
-        # 尝试不同的编码方式解决乱码问题
-        if website == "央广网文旅频道":
-            # 央广网详情页编码处理
-            try:
-                # 先尝试GBK编码，这是央广网常用的编码
-                response.encoding = "gbk"
-                test_content = response.text
-                # 检查是否有乱码特征
-                if any(ch in test_content for ch in ['锟斤拷', '烫烫烫', '????']):
-                    response.encoding = response.apparent_encoding
-            except Exception:
-                response.encoding = "utf-8"  # 默认使用UTF-8
-        else:
-            # 其他网站使用自动检测编码
-            response.encoding = response.apparent_encoding
-        
-        # 解析内容
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # 根据不同网站使用不同的内容提取策略
-        main_paragraphs = []
-        
-        # 1. 查找主要内容容器 - 使用网站特定策略
-        main_content = None
-        if website == "中国旅游新闻网":
-            # 中国旅游新闻网特定内容提取
-            main_content = soup.select_one('div.article-content, div#article_body, div.content, div.main-content, div.article-body')
-        elif website == "人民网旅游频道":
-            # 人民网旅游频道特定内容提取
-            main_content = soup.select_one('div#rwb_zw, div#articleText, div.rm_txt_con, div.article-content, div.content, div.main')
-        elif website == "央广网文旅频道":
-            # 央广网文旅频道特定内容提取
-            main_content = soup.select_one('div.article-content, div.content, div.main, div.article-body, div.article-text')
-        
-        # 如果没有找到特定内容，尝试通用选择器
-        if not main_content:
-            main_content = soup.select_one('div.content, div#article, div.article-content, div.content-main, div.main-content, div.article-body, div.article-text, div.text-content')
+        return await asyncio.to_thread(_extract_news_content, response, link, website)
+    except Exception as e:
+        return f"加载内容失败: {str(e)}"
+
+def _extract_news_content(response, link, website):
+    """从正文页响应中提取正文段落"""
+    # 识别编码：响应头/BOM/meta 声明优先，其次按主机记忆和站点提示，最后才做统计检测
+    with instrumentation.stage('article_decode', website):
+        resolve_encoding(response, url=link, hint=websites.get(website, {}).get("encoding"))
+        html_text = response.text
+    
+    # 解析内容
+    with instrumentation.stage('article_parse', website):
+        soup = BeautifulSoup(html_text, 'html.parser')
+    
+    # 根据不同网站使用不同的内容提取策略
+    main_paragraphs = []
+    
+    # 1. 查找主要内容容器 - 使用网站特定策略
+    main_content = None
+    if website == "中国旅游新闻网":
+        # 中国旅游新闻网特定内容提取
+        main_content = soup.select_one('div.article-content, div#article_body, div.content, div.main-content, div.article-body')
+    elif website == "人民网旅游频道":
+        # 人民网旅游频道特定内容提取
+        main_content = soup.select_one('div#rwb_zw, div#articleText, div.rm_txt_con, div.article-content, div.content, div.main')
+    elif website == "央广网文旅频道":
+        # 央广网文旅频道特定内容提取
+        main_content = soup.select_one('div.article-content, div.content, div.main, div.article-body, div.article-text')
+    
+    # 如果没有找到特定内容，尝试通用选择器
+    if not main_content:
+        main_content = soup.select_one('div.content, div#article, div.article-content, div.content-main, div.main-content, div.article-body, div.article-text, div.text-content')
+    
+    # 如果仍然没有找到，尝试更通用的选择器
+    if not main_content:
+        # 查找包含大量文本的容器
+        content_candidates = soup.select('div, article, section')
+        for candidate in content_candidates:
+            text_length = len(candidate.get_text(strip=True))
+            if text_length > 200:  # 假设主要内容至少200字符
+                main_content = candidate
+                break
+    
+    if main_content:
+        # 2. 首先尝试提取p标签内容
+        paragraphs = main_content.find_all('p')
         
-        # 如果仍然没有找到，尝试更通用的选择器
-        if not main_content:
-            # 查找包含大量文本的容器
-            content_candidates = soup.select('div, article, section')
-            for candidate in content_candidates:
-                text_length = len(candidate.get_text(strip=True))
-                if text_length > 200:  # 假设主要内容至少200字符
-                    main_content = candidate
-                    break
+        for p in paragraphs:
+            text = p.get_text(strip=True)
+            if text and len(text) > 5:
+                main_paragraphs.append(text)
         
-        if main_content:
-            # 2. 首先尝试提取p标签内容
-            paragraphs = main_content.find_all('p')
-            
-            for p in paragraphs:
-                text = p.get_text(strip=True)
-                if text and len(text) > 5:
+        # 如果p标签内容不足，再尝试提取其他标签内容
+        if len(main_paragraphs) < 3:
+            # 尝试提取div标签内的文本内容
+            divs = main_content.find_all('div')
+            for div in divs:
+                text = div.get_text(strip=True)
+                if text and len(text) > 5 and text not in main_paragraphs:
                     main_paragraphs.append(text)
             
-            # 如果p标签内容不足，再尝试提取其他标签内容
-            if len(main_paragraphs) < 3:
-                # 尝试提取div标签内的文本内容
-                divs = main_content.find_all('div')
-                for div in divs:
-                    text = div.get_text(strip=True)
-                    if text and len(text) > 5 and text not in main_paragraphs:
-                        main_paragraphs.append(text)
-                
-                # 尝试提取span标签内容
-                spans = main_content.find_all('span')
-                for span in spans:
-                    text = span.get_text(strip=True)
-                    if text and len(text) > 5 and text not in main_paragraphs:
-                        main_paragraphs.append(text)
-                
-                # 尝试提取section标签内容
-                sections = main_content.find_all('section')
-                for section in sections:
-                    text = section.get_text(strip=True)
-                    if text and len(text) > 5 and text not in main_paragraphs:
-                        main_paragraphs.append(text)
-                
-                # 尝试提取article标签内容
-                articles = main_content.find_all('article')
-                for article in articles:
-                    text = article.get_text(strip=True)
-                    if text and len(text) > 5 and text not in main_paragraphs:
-                        main_paragraphs.append(text)
-        
-        # 如果找到正文段落，返回它们
-        if main_paragraphs:
-            return "\n\n".join(main_paragraphs)
-        else:
-            # 备用策略：使用网站特定的备用提取策略
-            if website == "环球网旅游频道":
-                # 环球网备用策略 - 尝试更多的容器选择器
-                content_elements = soup.select('div[class*="article"], div[id*="content"], div[class*="main"], div[class*="text-main"]')
-            elif website == "央广网文旅频道":
-                # 央广网备用策略 - 尝试更多的容器选择器
-                content_elements = soup.select('div[class*="article"], div[id*="article"], div[class*="article-body"], div[class*="article-content"]')
-            else:
-                # 通用备用策略
-                content_elements = soup.select('div[class*="article-content"], div[class*="content-main"], div[id*="content"], div[class*="content"]')
-            
-            all_text = "\n\n".join([elem.get_text(separator='\n', strip=True) for elem in content_elements])
+            # 尝试提取span标签内容
+            spans = main_content.find_all('span')
+            for span in spans:
+                text = span.get_text(strip=True)
+                if text and len(text) > 5 and text not in main_paragraphs:
+                    main_paragraphs.append(text)
             
-            # 清理可能的乱码
-            if website == "央广网文旅频道" and all_text:
-                # 尝试替换可能的乱码字符
-                all_text = all_text.replace("锟斤拷", "").replace("烫烫烫", "").strip()
+            # 尝试提取section标签内容
+            sections = main_content.find_all('section')
+            for section in sections:
+                text = section.get_text(strip=True)
+                if text and len(text) > 5 and text not in main_paragraphs:
+                    main_paragraphs.append(text)
             
-            if all_text and len(all_text.strip()) > 20:
-                return all_text
-            else:
-                return "无法提取内容，请点击上方链接在浏览器中查看完整内容。"
+            # 尝试提取article标签内容
+            articles = main_content.find_all('article')
+            for article in articles:
+                text = article.get_text(strip=True)
+                if text and len(text) > 5 and text not in main_paragraphs:
+                    main_paragraphs.append(text)
+    
+    # 如果找到正文段落，返回它们
+    if main_paragraphs:
+        return "\n\n".join(main_paragraphs)
+    else:
+        # 备用策略：使用网站特定的备用提取策略
+        if website == "环球网旅游频道":
+            # 环球网备用策略 - 尝试更多的容器选择器
+            content_elements = soup.select('div[class*="article"], div[id*="content"], div[class*="main"], div[class*="text-main"]')
+        elif website == "央广网文旅频道":
+            # 央广网备用策略 - 尝试更多的容器选择器
+            content_elements = soup.select('div[class*="article"], div[id*="article"], div[class*="article-body"], div[class*="article-content"]')
+        else:
+            # 通用备用策略
+            content_elements = soup.select('div[class*="article-content"], div[class*="content-main"], div[id*="content"], div[class*="content"]')
         
-    except Exception as e:
-        return f"加载内容失败: {str(e)}"
+        all_text = "\n\n".join([elem.get_text(separator='\n', strip=True) for elem in content_elements])
+        
+        # 清理可能的乱码
+        if website == "央广网文旅频道" and all_text:
+            # 尝试替换可能的乱码字符
+            all_text = all_text.replace("锟斤拷", "").replace("烫烫烫", "").strip()
+        
+        if all_text and len(all_text.strip()) > 20:
+            return all_text
+        else:
+            return "无法提取内容，请点击上方链接在浏览器中查看完整内容。"
+
+# get_news_content 的确定性失败结果：作为负缓存保存；网络异常等临时错误不缓存
+_NEGATIVE_CONTENT_PREFIXES = ('链接格式无效', '页面不存在(404)', '无法提取内容')
+_TRANSIENT_CONTENT_PREFIXES = ('加载内容失败', '页面访问失败')
+
+def get_news_content_cached(link, website):
+    """带缓存的 get_news_content；同一链接的并发请求只抓取一次"""
+    _snapshot.ensure_loaded()
+    cached = _article_cache.get(link)
+    result = 'article_hits'
+    if cached is None:
+        cached = _shared_article(link)
+        result = 'article_shared_hits' if cached is not None else 'article_misses'
+    instrumentation.CACHE_REQUESTS.inc(source=website, result=result)
+    if cached is not None:
+        return cached
+    content = _load_article(link, website)
+    # 若刚好等到了一次预取的结果，计为预取命中
+    _article_cache.mark_used(link)
+    return content
+
+def _load_article(link, website, prefetched=False):
+    def load():
+        content = get_news_content(link, website)
+        _store_article(link, content, prefetched=prefetched)
+        return content
+
+    # 进程内合并并发请求，跨进程由后端的锁合并
+    return _single_flight(('article', link),
+                          lambda: _shared_flight(_article_key(link), load, lambda: _shared_article(link)))
+
+def _article_key(link):
+    return 'article:' + hashlib.sha1(canonical_link(link).encode('utf-8')).hexdigest()
+
+def _shared_article(link):
+    """读取其他进程写入共享后端的正文并放入本地缓存（沿用原过期时间）；没有时返回 None"""
+    if not _backend.shared:
+        return None
+    blob = _backend_call(_backend.get, _article_key(link))
+    if blob is None:
+        return None
+    try:
+        saved = json.loads(blob)
+    except ValueError:
+        return None
+    _article_cache.put(link, saved['text'], negative=saved['negative'], expires_at=saved['expires_at'])
+    return saved['text']
+
+def _publish_article(link, content, negative):
+    if not _backend.shared:
+        return
+    ttl = _article_cache.negative_ttl if negative else _article_cache.ttl
+    blob = json.dumps({'text': content, 'negative': negative, 'expires_at': time.time() + ttl}, ensure_ascii=False)
+    _backend_call(_backend.set, _article_key(link), blob.encode('utf-8'), ttl)
+
+def _store_article(link, content, prefetched=False):
+    if not content.startswith(_TRANSIENT_CONTENT_PREFIXES):
+        negative = content.startswith(_NEGATIVE_CONTENT_PREFIXES)
+        _article_cache.put(link, content, negative=negative, prefetched=prefetched)
+        _publish_article(link, content, negative)
+        _snapshot.mark_dirty()
+        if not negative:
+            # 正文写入归档并加入全文索引
+            _archive_write('archive', lambda: _archive.set_content(link, content))
+
+# 批量抓取中会阻塞的部分（等待 single-flight 与跨进程锁、写缓存/后端/归档）在单独的线程池中执行，
+# 既不阻塞事件循环，也不占用抓取引擎发送请求与解析所用的线程池
+_batch_executor = ThreadPoolExecutor(max_workers=_crawl_engine.concurrency, thread_name_prefix='crawl-batch')
+
+async def _in_batch_thread(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_batch_executor, functools.partial(fn, *args))
+
+async def _refresh_news_async(website):
+    # 与请求触发的刷新共用 single-flight 与跨进程锁：同一来源同时只有一个抓取，增量历史的合并不会交错
+    return await _in_batch_thread(_single_flight, website, lambda: _refresh_news(website, force_refresh=True))
+
+def _crawl_article(link, website):
+    content = _shared_article(link)
+    if content is None:
+        content = _load_article(link, website)
+    return content
+
+async def _crawl_article_async(link, website):
+    content = await _in_batch_thread(_crawl_article, link, website)
+    return not content.startswith(_TRANSIENT_CONTENT_PREFIXES)
+
+async def _crawl_uncached_articles_async(site_items, articles_per_source):
+    """并发抓取每个来源前若干条尚未缓存的正文；site_items 为 [(来源, 新闻列表)]"""
+    targets = []
+    for site, items in site_items:
+        for item in list(items)[:articles_per_source]:
+            if not _article_cache.contains(item['link']):
+                targets.append((item['link'], site))
+    loaded = await asyncio.gather(*(_crawl_article_async(link, site) for link, site in targets))
+    return {'requested': len(targets), 'cached': sum(loaded)}
+
+async def crawl_batch_async(sites, articles_per_source=0):
+    """批量刷新：所有来源的列表页并发抓取并写入缓存，再并发抓取每个来源前若干条尚未缓存的正文。
+
+    全部请求共用抓取引擎的并发上限，总耗时接近最慢的一次往返，而不是逐个请求耗时之和。
+    """
+    t0 = time.time()
+    lists = await asyncio.gather(*(_refresh_news_async(site) for site in sites))
+    articles = await _crawl_uncached_articles_async(zip(sites, lists), articles_per_source)
+    return {
+        'sources': {site: len(items) for site, items in zip(sites, lists)},
+        'articles': articles,
+        'duration_ms': int((time.time() - t0) * 1000),
+    }
+
+def crawl_batch(sites=None, articles_per_source=0):
+    """crawl_batch_async 的同步桥接"""
+    return _crawl_engine.run(crawl_batch_async(list(sites or websites), articles_per_source))
+
+_prefetcher = ArticlePrefetcher(_article_cache, lambda link, website: _load_article(link, website, prefetched=True))
 
 @app.route('/healthz')
 def healthz():
@@ -1195,24 +1871,138 @@ def favicon():
     # 避免日志里出现对favicon的错误请求
     return ('', 204)
 
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+    g.trace_token = tracing.start(request.method, request.full_path.rstrip('?'))
+
+@app.after_request
+def _observe_request(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # 以路由规则作标签，避免按实际URL产生无限多的时间序列
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        instrumentation.ROUTE_SECONDS.observe(time.perf_counter() - started, route=route,
+                                              method=request.method, status=response.status_code)
+    token = g.pop('trace_token', None)
+    if token is not None:
+        server_timing = tracing.finish(token, response.status_code)
+        if server_timing:
+            response.headers['Server-Timing'] = server_timing
+    return response
+
 @app.route('/metrics')
 def metrics():
     if not _check_admin_key():
         return jsonify({'error': 'unauthorized'}), 401
-    return jsonify(_metrics)
+    if request.args.get('format') == 'prometheus':
+        return Response(instrumentation.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    with _cache_lock:
+        snapshot = {key: dict(value) for key, value in _metrics.items()}
+        snapshot['cache'] = {site: dict(stats) for site, stats in _metrics['cache'].items()}
+        snapshot['fallback'] = {site: dict(stats) for site, stats in _metrics['fallback'].items()}
+        cached_sites = list(_cache.keys())
+    now = time.time()
+    for site in cached_sites:
+        snapshot['cache'].setdefault(site, {}).update(_cache_status(site, now))
+    snapshot['http_pool'] = http_session.pool_stats()
+    snapshot['transport'] = transport.stats()
+    snapshot['crawl_engine'] = _crawl_engine.stats()
+    snapshot['scheduler'] = _scheduler.stats()
+    snapshot['snapshot'] = _snapshot.stats()
+    snapshot['cache_backend'] = _backend.stats()
+    if _archive is not None:
+        snapshot['archive'] = _archive.stats()
+    snapshot['article_cache'] = _article_cache.stats()
+    snapshot['article_prefetch'] = _prefetcher.stats()
+    with _views_lock:
+        snapshot['views'] = dict(_view_stats, entries=len(_views))
+    snapshot['cache_policy'] = {
+        'soft_ttl_s': CACHE_TTL_SECONDS,
+        'hard_ttl_s': CACHE_HARD_TTL_SECONDS,
+    }
+    snapshot['list_parser'] = list_parser.backend_name()
+    snapshot['encoding'] = encoding_resolver.stats()
+    snapshot['tracing'] = tracing.stats()
+    with _errors_lock:
+        snapshot['errors'] = {
+            'buffered': len(_errors),
+            'capacity': ERROR_LOG_SIZE,
+            'by_source': {site: dict(stages) for site, stages in _error_counts.items()},
+        }
+    snapshot['logging'] = structured_log.stats()
+    snapshot['histograms'] = {
+        'crawl_stages': instrumentation.CRAWL_STAGE_SECONDS.summary(),
+        'upstream_connect': instrumentation.UPSTREAM_CONNECT_SECONDS.summary(),
+        'routes': instrumentation.ROUTE_SECONDS.summary(),
+    }
+    return jsonify(snapshot)
 
 @app.route('/logs')
 def logs():
     if not _check_admin_key():
         return jsonify({'error': 'unauthorized'}), 401
     limit = int(request.args.get('limit', '100'))
-    return jsonify(_errors[-limit:])
+    website = request.args.get('website')
+    with _errors_lock:
+        entries = list(_errors)
+    if website:
+        entries = [entry for entry in entries if entry['website'] == website]
+    return jsonify(entries[-limit:])
+
+@app.route('/traces')
+def traces():
+    """抽样保留的慢请求轨迹（新的在前）；?min_ms= 只看更慢的请求"""
+    if not _check_admin_key():
+        return jsonify({'error': 'unauthorized'}), 401
+    try:
+        limit = max(int(request.args.get('limit', '20')), 0)
+    except ValueError:
+        limit = 20
+    try:
+        min_ms = float(request.args.get('min_ms', '0'))
+    except ValueError:
+        min_ms = 0
+    return jsonify({'stats': tracing.stats(), 'traces': tracing.recent(limit, min_ms)})
+
+@app.route('/crawl', methods=['POST', 'GET'])
+def crawl():
+    """批量刷新来源列表（?sources=a,b，默认全部），?articles=N 同时预取每个来源前 N 条正文"""
+    if not _check_admin_key():
+        return jsonify({'error': 'unauthorized'}), 401
+    sources_str = request.args.get('sources', '').strip()
+    sites = [s for s in [x.strip() for x in sources_str.split(',')] if s in websites] if sources_str else list(websites)
+    try:
+        articles = max(int(request.args.get('articles', '0')), 0)
+    except ValueError:
+        articles = 0
+    return jsonify(crawl_batch(sites, articles))
+
+@app.route('/cron/crawl')
+def cron_crawl():
+    """定时触发（Vercel Cron 等）：执行到期的抓取任务，?force=1 执行全部；
+    接受管理密钥，或 Vercel Cron 附带的 Authorization: Bearer $CRON_SECRET"""
+    cron_secret = os.environ.get('CRON_SECRET', '').strip()
+    from_cron = bool(cron_secret) and request.headers.get('Authorization') == f'Bearer {cron_secret}'
+    if not (from_cron or _check_admin_key()):
+        return jsonify({'error': 'unauthorized'}), 401
+    ran = _scheduler.run_due(force=request.args.get('force') == '1')
+    return jsonify({'ran': ran, 'scheduler': _scheduler.stats()})
 
 @app.route('/clear_cache', methods=['POST', 'GET'])
 def clear_cache():
     if not _check_admin_key():
         return jsonify({'error': 'unauthorized'}), 401
-    _cache.clear()
+    with _cache_lock:
+        _cache.clear()
+        _seen_links.clear()
+    with _views_lock:
+        _views.clear()
+    _article_cache.clear()
+    if _backend.shared:
+        _backend_call(_backend.clear, 'news:')
+        _backend_call(_backend.clear, 'article:')
+    _snapshot.mark_dirty()
     return jsonify({'ok': True})
 
 # --- UI helpers ---
@@ -1221,8 +2011,8 @@ def highlight_filter(text, keyword):
     if not text or not keyword:
         return text
     try:
-        pattern = re.compile(re.escape(keyword), re.IGNORECASE)
-        return Markup(pattern.sub(lambda m: f'<mark>{m.group(0)}</mark>', str(text)))
+        # 每个搜索词只编译一次高亮正则（parse_query 带缓存）
+        return parse_query(keyword).highlight(text)
     except Exception:
         return text
 
@@ -1251,6 +2041,71 @@ def sitemap_xml():
 {xml_urls}
 </urlset>"""
     return Response(xml, mimetype='application/xml; charset=utf-8')
+
+# --- 缓存快照 ---
+def _collect_snapshot():
+    """快照内容：各来源列表（含时间戳与内容哈希）、增量抓取的链接历史、列表页验证器、正文缓存与公司周报"""
+    with _cache_lock:
+        news = {site: {key: entry[key] for key in ('data', 'ts', 'modified', 'digest')}
+                for site, entry in _cache.items()}
+        seen_links = {site: list(links) for site, links in _seen_links.items()}
+    with _validators_lock:
+        validators = dict(_crawl_validators)
+    with _reports_lock:
+        reports = dict(_reports) if _reports['data'] is not None else None
+    return {'news': news, 'seen_links': seen_links, 'validators': validators,
+            'articles': _article_cache.export(), 'reports': reports}
+
+def _restore_snapshot(state):
+    """把快照合并回内存：保留原时间戳，内存中已有更新数据的条目不覆盖"""
+    restored = []
+    for site, saved in state.get('news', {}).items():
+        if site not in websites:
+            continue
+        # 锁外构建搜索索引
+        entry = dict(saved, version=next(_cache_versions), index=SearchIndex(saved['data']), restored=True)
+        with _cache_lock:
+            current = _cache.get(site)
+            if current is None or current['ts'] < entry['ts']:
+                _cache[site] = entry
+                restored.append(site)
+    with _cache_lock:
+        for site, links in state.get('seen_links', {}).items():
+            if site in websites and site not in _seen_links:
+                _seen_links[site] = OrderedDict.fromkeys(links)
+    with _validators_lock:
+        for url, saved in state.get('validators', {}).items():
+            _crawl_validators.setdefault(url, saved)
+    articles = _article_cache.load(state.get('articles', []))
+    reports = state.get('reports')
+    with _reports_lock:
+        if reports and _reports['data'] is None:
+            _reports.update(reports)
+    logger.info("快照恢复: %d 个来源, %d 篇正文", len(restored), articles)
+
+_snapshot = snapshot.Snapshotter(_collect_snapshot, _restore_snapshot)
+
+# --- 定时抓取 ---
+# 各来源的刷新间隔：websites 中的 refresh_interval 优先，否则用默认值；公司周报单独设置
+SCHEDULE_DEFAULT_INTERVAL_S = int(os.environ.get('SCHEDULE_DEFAULT_INTERVAL_S', str(CACHE_TTL_SECONDS)))
+SCHEDULE_WECHAT_INTERVAL_S = int(os.environ.get('SCHEDULE_WECHAT_INTERVAL_S', str(REPORTS_TTL_SECONDS)))
+# 每次刷新来源后预取前 N 条尚未缓存的正文（0 表示不预取）
+SCHEDULE_ARTICLES = int(os.environ.get('SCHEDULE_ARTICLES', '0'))
+
+def _scheduled_refresh(website):
+    _snapshot.ensure_loaded()
+    data = _single_flight(website, lambda: _refresh_news(website, force_refresh=True))
+    if SCHEDULE_ARTICLES and data:
+        _crawl_engine.run(_crawl_uncached_articles_async([(website, data)], SCHEDULE_ARTICLES))
+
+_scheduler = scheduler.Scheduler()
+for _site, _config in websites.items():
+    _scheduler.add(_site, _config.get('refresh_interval', SCHEDULE_DEFAULT_INTERVAL_S),
+                   functools.partial(_scheduled_refresh, _site))
+_scheduler.add('公司周报', SCHEDULE_WECHAT_INTERVAL_S, lambda: _single_flight('wechat_reports', refresh_wechat_reports))
+if scheduler.SCHEDULER_MODE == 'thread':
+    _scheduler.start()
+
 # Vercel适配：标准Flask应用入口点
 if __name__ == '__main__':
     # 确保中文正常显示
@@ -0,0 +1,283 @@
+"""新闻归档：SQLite（WAL）持久保存抓取到的全部新闻与正文，支持全文检索、日期范围与游标分页。
+
+- 表 news 按链接唯一，正文单独存放在 news_content 中，按日期扫描索引时不读取正文；
+  (date, id) 与 (source, date, id) 上的索引支撑按日期倒序的游标分页，翻到多深都只读取一页的行，不使用 OFFSET
+- FTS5 索引标题与正文：SQLite 的分词器不能切分中文，这里沿用 search_index 的切分方式
+  （汉字单字 + 相邻二字，拉丁文本按词）预先生成词项写入 FTS 表；查询时词项取交集，
+  再在 SQL 中做一次子串校验。拉丁片段在 FTS 中按词前缀匹配，因此只能命中以它开头的词，
+  这一点与内存中的标题搜索（词内任意位置）不同；不含可索引字符的词项（纯标点）只做子串校验，
+  只有这类词项而没有日期范围与游标的请求仍用内存视图
+- 搜索的执行方式按 FTS 中的命中数选择（至多数到 sqrt(每页条数 × 总行数) 个）：命中少时由 FTS 取出候选再按日期排序，
+  命中多时沿日期索引扫描并逐行校验，扫到一页即停止；两种方式读取的行数都在 sqrt(每页条数 × 总行数) 的量级
+- 每个线程一个连接；写入在进程内串行，WAL 下读取不被写入阻塞
+
+ARCHIVE_DB 为数据库文件路径，留空（默认）时不启用归档。
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import search_index
+
+ARCHIVE_DB = os.environ.get('ARCHIVE_DB', '').strip()
+
+# 单次查询返回的最大行数
+MAX_PAGE_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS news (
+    id INTEGER PRIMARY KEY,
+    link TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    source TEXT NOT NULL,
+    date TEXT NOT NULL,
+    first_seen INTEGER NOT NULL,
+    updated INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS news_content (
+    id INTEGER PRIMARY KEY,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS news_date ON news (date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS news_source_date ON news (source, date DESC, id DESC);
+CREATE VIRTUAL TABLE IF NOT EXISTS news_fts USING fts5 (title_terms, content_terms, tokenize = 'unicode61');
+"""
+
+_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+# 逐行子串校验：标题不命中时才读取正文
+_VERIFY_SQL = ("(instr(lower(n.title), ?) > 0 OR "
+               "instr(lower(coalesce((SELECT c.content FROM news_content c WHERE c.id = n.id), '')), ?) > 0)")
+
+
+def index_terms(text):
+    """与 search_index 相同的切分：汉字单字与相邻二字、拉丁词，空格分隔"""
+    grams, words = search_index.index_terms(str(text or '').lower())
+    return ' '.join(sorted(grams | words))
+
+
+def query_tokens(terms):
+    """把查询词项切分为 FTS 词元 [(词元, 是否前缀匹配)]：汉字取单字或相邻二字，拉丁片段按前缀"""
+    tokens = []
+    for term in terms:
+        grams, fragments = search_index.query_terms(term)
+        tokens.extend((gram, False) for gram in grams)
+        tokens.extend((fragment, True) for fragment in fragments)
+    return list(dict.fromkeys(tokens))
+
+
+def match_expression(tokens):
+    return ' AND '.join('"%s"%s' % (token, '*' if prefix else '') for token, prefix in tokens)
+
+
+def valid_date(value):
+    """YYYY-MM-DD 格式的日期原样返回，其他输入返回 None"""
+    value = (value or '').strip()
+    if not _DATE_RE.match(value):
+        return None
+    try:
+        datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        return None
+    return value
+
+
+def _day_after(date):
+    return (datetime.strptime(date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+
+
+def in_date_range(date, date_from=None, date_to=None):
+    """date 是否落在 [date_from, date_to] 内（含两端；date 可以带时间部分）"""
+    date = str(date or '')
+    if date_from and date < date_from:
+        return False
+    return not date_to or date < _day_after(date_to)
+
+
+def encode_cursor(row):
+    return f"{row['date']}_{row['id']}"
+
+
+def decode_cursor(cursor):
+    """游标为上一页最后一行的 日期_id；格式不对时返回 None（从第一页开始）"""
+    date, _, row_id = (cursor or '').rpartition('_')
+    if not date or not row_id.isdigit():
+        return None
+    return date, int(row_id)
+
+
+class Archive:
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._stats = {'items_written': 0, 'items_inserted': 0, 'contents_written': 0,
+                       'queries': 0, 'query_ms': 0.0, 'fts_plans': 0, 'scan_plans': 0}
+        self._stats_lock = threading.Lock()
+        with self._write_lock:
+            conn = self._conn()
+            conn.executescript(_SCHEMA)
+            conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _count(self, field, amount=1):
+        with self._stats_lock:
+            self._stats[field] += amount
+
+    def add_items(self, items):
+        """写入一个来源的新闻列表：新链接插入并建立索引，已有链接只在标题或日期变化时更新"""
+        now = int(time.time())
+        inserted = 0
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                for item in items:
+                    link, title, date = item.get('link'), item.get('title', ''), item.get('date', '')
+                    if not link:
+                        continue
+                    row = conn.execute('SELECT id, title, date FROM news WHERE link = ?', (link,)).fetchone()
+                    if row is None:
+                        cur = conn.execute(
+                            'INSERT INTO news (link, title, source, date, first_seen, updated) VALUES (?, ?, ?, ?, ?, ?)',
+                            (link, title, item.get('source', ''), date, now, now))
+                        conn.execute('INSERT INTO news_fts (rowid, title_terms, content_terms) VALUES (?, ?, ?)',
+                                     (cur.lastrowid, index_terms(title), ''))
+                        inserted += 1
+                    elif row['title'] != title or row['date'] != date:
+                        conn.execute('UPDATE news SET title = ?, date = ?, updated = ? WHERE id = ?',
+                                     (title, date, now, row['id']))
+                        conn.execute('UPDATE news_fts SET title_terms = ? WHERE rowid = ?', (index_terms(title), row['id']))
+        self._count('items_written', len(items))
+        self._count('items_inserted', inserted)
+        return inserted
+
+    def set_content(self, link, content):
+        """保存提取出的正文并加入全文索引（链接尚未归档或正文未变化时忽略）"""
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                row = conn.execute('SELECT n.id, c.content FROM news n LEFT JOIN news_content c ON c.id = n.id '
+                                   'WHERE n.link = ?', (link,)).fetchone()
+                if row is None or row['content'] == content:
+                    return False
+                conn.execute('INSERT OR REPLACE INTO news_content (id, content) VALUES (?, ?)', (row['id'], content))
+                conn.execute('UPDATE news SET updated = ? WHERE id = ?', (int(time.time()), row['id']))
+                conn.execute('UPDATE news_fts SET content_terms = ? WHERE rowid = ?', (index_terms(content), row['id']))
+        self._count('contents_written')
+        return True
+
+    def query(self, sources=None, search_text='', date_from=None, date_to=None, limit=50, cursor=None):
+        """按日期倒序查询；返回 (行列表, 下一页游标)，没有下一页时游标为 None。
+
+        sources 为来源列表（None 表示全部）；search_text 按空白切分为词项，需全部命中标题或正文；
+        date_from/date_to 为闭区间的 YYYY-MM-DD；cursor 为上一页返回的游标。
+        """
+        started = time.perf_counter()
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        conn = self._conn()
+        # 与内存中的搜索相同，每个词项都须出现在标题或正文中；只含标点等无法索引的词项只做子串检查
+        terms = list(dict.fromkeys((search_text or '').lower().split()))
+        tokens = query_tokens(terms)
+        tables = 'news n'
+        where, params = [], []
+        if tokens:
+            expression = match_expression(tokens)
+            # 在 FTS 中至多数出 sqrt(每页条数 × 总行数) 个候选，决定由 FTS 取候选还是沿日期索引扫描
+            total = conn.execute('SELECT max(id) FROM news').fetchone()[0] or 0
+            threshold = int((limit * total) ** 0.5)
+            probe = conn.execute('SELECT count(*) FROM (SELECT 1 FROM news_fts WHERE news_fts MATCH ? LIMIT ?)',
+                                 (expression, threshold + 1)).fetchone()[0]
+            if probe <= threshold:
+                # 命中少：由 FTS 取出全部候选，再按日期排序
+                tables = 'news_fts f CROSS JOIN news n ON n.id = f.rowid'
+                where.append('news_fts MATCH ?')
+                params.append(expression)
+                self._count('fts_plans')
+            else:
+                # 命中多：沿日期索引扫描，平均每 总行数/命中数 行就有一行命中，扫到一页即停止
+                self._count('scan_plans')
+        elif terms:
+            self._count('scan_plans')
+        for term in terms:
+            where.append(_VERIFY_SQL)
+            params.extend([term, term])
+        if sources is not None:
+            if not sources:
+                return [], None
+            if len(sources) == 1:
+                where.append('n.source = ?')
+            else:
+                # 多个来源时不用 (source, date) 索引，沿日期索引扫描即可按顺序取到一页
+                where.append(f"+n.source IN ({','.join('?' * len(sources))})")
+            params.extend(sources)
+        if date_from:
+            where.append('n.date >= ?')
+            params.append(date_from)
+        if date_to:
+            # 与 in_date_range 相同：小于次日，带时间部分的日期也算在当天
+            where.append('n.date < ?')
+            params.append(_day_after(date_to))
+        position = decode_cursor(cursor)
+        if position:
+            where.append('(n.date, n.id) < (?, ?)')
+            params.extend(position)
+        sql = f'SELECT n.id, n.title, n.link, n.source, n.date FROM {tables}'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY n.date DESC, n.id DESC LIMIT ?'
+        params.append(limit + 1)
+        rows = conn.execute(sql, params).fetchall()
+        self._count('queries')
+        self._count('query_ms', (time.perf_counter() - started) * 1000)
+        next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        return [{'title': r['title'], 'link': r['link'], 'source': r['source'], 'date': r['date']}
+                for r in rows[:limit]], next_cursor
+
+    def iter_query(self, sources=None, search_text='', date_from=None, date_to=None, max_rows=None, batch=MAX_PAGE_SIZE):
+        """按游标分批读取全部匹配行（导出用），内存占用与总行数无关"""
+        cursor = None
+        produced = 0
+        while True:
+            rows, cursor = self.query(sources, search_text, date_from, date_to, limit=batch, cursor=cursor)
+            for row in rows:
+                if max_rows is not None and produced >= max_rows:
+                    return
+                produced += 1
+                yield row
+            if cursor is None:
+                return
+
+    def stats(self):
+        with self._stats_lock:
+            result = dict(self._stats)
+        result['query_ms'] = round(result['query_ms'], 1)
+        # 归档只增不删，max(id) 即行数（count(*) 需要扫描整张表）
+        result['rows'] = self._conn().execute('SELECT max(id) FROM news').fetchone()[0] or 0
+        result['path'] = self.path
+        return result
+
+
+def open_default():
+    """按 ARCHIVE_DB 打开归档；未配置或打开失败时返回 None（不影响抓取与页面）"""
+    if not ARCHIVE_DB:
+        return None
+    try:
+        return Archive(ARCHIVE_DB)
+    except sqlite3.Error:
+        import logging
+        logging.getLogger(__name__).exception("打开归档数据库失败: %s", ARCHIVE_DB)
+        return None
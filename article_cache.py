@@ -0,0 +1,247 @@
+"""新闻正文缓存：按规范化链接缓存 get_news_content 的结果。
+
+- 按 TTL 过期，按占用字节数做 LRU 淘汰
+- 可选 zlib 压缩存储的正文
+- 支持负缓存（404、链接无效、提取失败等），避免坏链接反复请求上游
+- ArticlePrefetcher 在后台预取相邻文章，并统计预取命中与浪费
+"""
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit
+
+ARTICLE_CACHE_TTL_SECONDS = int(os.environ.get('ARTICLE_CACHE_TTL_SECONDS', '1800'))
+ARTICLE_CACHE_NEGATIVE_TTL_SECONDS = int(os.environ.get('ARTICLE_CACHE_NEGATIVE_TTL_SECONDS', '600'))
+ARTICLE_CACHE_MAX_BYTES = int(os.environ.get('ARTICLE_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+ARTICLE_CACHE_COMPRESS = os.environ.get('ARTICLE_CACHE_COMPRESS', '0') == '1'
+
+# 相邻文章预取（默认关闭）：前后各预取几篇、后台线程数、排队上限
+ARTICLE_PREFETCH = os.environ.get('ARTICLE_PREFETCH', '0') == '1'
+ARTICLE_PREFETCH_DEPTH = int(os.environ.get('ARTICLE_PREFETCH_DEPTH', '1'))
+ARTICLE_PREFETCH_WORKERS = int(os.environ.get('ARTICLE_PREFETCH_WORKERS', '2'))
+ARTICLE_PREFETCH_MAX_PENDING = int(os.environ.get('ARTICLE_PREFETCH_MAX_PENDING', '16'))
+
+
+def canonical_link(link):
+    """规范化链接作为缓存键：去空白、协议与主机小写、去掉片段"""
+    link = (link or '').strip()
+    try:
+        parts = urlsplit(link)
+    except ValueError:
+        return link
+    if not parts.scheme or not parts.netloc:
+        return link
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', parts.query, ''))
+
+
+class _Entry:
+    __slots__ = ('payload', 'compressed', 'expires_at', 'negative', 'prefetched')
+
+    def __init__(self, payload, compressed, expires_at, negative, prefetched=False):
+        self.payload = payload
+        self.compressed = compressed
+        self.expires_at = expires_at
+        self.negative = negative
+        self.prefetched = prefetched  # 由预取写入且尚未被读者读取
+
+
+class ArticleCache:
+    """线程安全的正文 LRU 缓存，容量以存储字节数计"""
+
+    def __init__(self, max_bytes=ARTICLE_CACHE_MAX_BYTES, ttl=ARTICLE_CACHE_TTL_SECONDS,
+                 negative_ttl=ARTICLE_CACHE_NEGATIVE_TTL_SECONDS, compress=ARTICLE_CACHE_COMPRESS):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.compress = compress
+        self._entries = OrderedDict()  # canonical link -> _Entry
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'negative_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'prefetch_hits': 0,    # 预取的条目被读者读取
+            'prefetch_wasted': 0,  # 预取的条目未被读取就过期、淘汰或被覆盖
+        }
+
+    def get(self, link):
+        """命中返回正文（或负缓存的提示文本），未命中或已过期返回 None"""
+        key = canonical_link(link)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            if entry.expires_at <= time.time():
+                self._remove(key)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['negative_hits' if entry.negative else 'hits'] += 1
+            self._consume_prefetch(entry)
+            payload, compressed = entry.payload, entry.compressed
+        if compressed:
+            payload = zlib.decompress(payload)
+        return payload.decode('utf-8')
+
+    def contains(self, link):
+        """是否有未过期的条目（不计入命中统计，也不改变LRU顺序）"""
+        key = canonical_link(link)
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry.expires_at > time.time()
+
+    def mark_used(self, link):
+        """读者直接拿到了加载结果（如等待中的预取）时调用，使预取计为命中"""
+        key = canonical_link(link)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._consume_prefetch(entry)
+
+    def _consume_prefetch(self, entry):
+        if entry.prefetched:
+            entry.prefetched = False
+            self._stats['prefetch_hits'] += 1
+
+    def put(self, link, text, negative=False, prefetched=False, expires_at=None):
+        """写入正文；expires_at 为绝对过期时间（恢复快照时沿用原值），默认按 TTL 计算"""
+        key = canonical_link(link)
+        payload = (text or '').encode('utf-8')
+        compressed = False
+        if self.compress and not negative:
+            packed = zlib.compress(payload, 6)
+            if len(packed) < len(payload):
+                payload, compressed = packed, True
+        if len(payload) > self.max_bytes:
+            # 放不下新正文时也要移除该链接已有的条目（旧正文或负缓存），否则会一直返回过时的内容
+            with self._lock:
+                self._remove(key)
+            return
+        if expires_at is None:
+            expires_at = time.time() + (self.negative_ttl if negative else self.ttl)
+        entry = _Entry(payload, compressed, expires_at, negative, prefetched)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._bytes += len(payload)
+            while self._bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats['evictions'] += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry.payload)
+            if entry.prefetched:
+                self._stats['prefetch_wasted'] += 1
+        return entry
+
+    def export(self):
+        """未过期的条目 [(链接, 正文, 过期时间, 是否负缓存)]，最久未用的在前，供快照保存"""
+        now = time.time()
+        with self._lock:
+            entries = [(key, e.payload, e.compressed, e.expires_at, e.negative)
+                       for key, e in self._entries.items() if e.expires_at > now]
+        return [(key, (zlib.decompress(payload) if compressed else payload).decode('utf-8'), expires_at, negative)
+                for key, payload, compressed, expires_at, negative in entries]
+
+    def load(self, entries):
+        """恢复 export() 的结果：沿用原过期时间，已过期或缓存中已有的条目跳过；返回恢复的条数"""
+        now = time.time()
+        restored = 0
+        for link, text, expires_at, negative in entries:
+            if expires_at <= now or self.contains(link):
+                continue
+            self.put(link, text, negative=negative, expires_at=expires_at)
+            restored += 1
+        return restored
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['negative_entries'] = sum(1 for e in self._entries.values() if e.negative)
+            stats['resident_bytes'] = self._bytes
+        lookups = stats['hits'] + stats['negative_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['hits'] + stats['negative_hits']) / lookups, 4) if lookups else 0.0
+        stats['max_bytes'] = self.max_bytes
+        stats['compress'] = self.compress
+        return stats
+
+
+class ArticlePrefetcher:
+    """后台预取相邻文章正文：有界线程池，跳过已缓存或已在排队的链接"""
+
+    def __init__(self, cache, loader, enabled=ARTICLE_PREFETCH, depth=ARTICLE_PREFETCH_DEPTH,
+                 workers=ARTICLE_PREFETCH_WORKERS, max_pending=ARTICLE_PREFETCH_MAX_PENDING):
+        self.cache = cache
+        self.loader = loader  # loader(link, website)：抓取并以 prefetched=True 写入缓存
+        self.enabled = enabled
+        self.depth = depth
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._stats = {'issued': 0, 'skipped_cached': 0, 'skipped_busy': 0, 'failed': 0}
+
+    def neighbours(self, news_data, index):
+        """当前文章前后各 depth 篇，下一篇优先"""
+        if index is None:
+            return []
+        after = news_data[index + 1:index + 1 + self.depth]
+        before = news_data[max(index - self.depth, 0):index][::-1]
+        return [(item.get('link'), item.get('source')) for item in after + before if item.get('link')]
+
+    def schedule(self, targets):
+        """提交预取任务：targets 为 [(link, website)]"""
+        if not self.enabled:
+            return
+        for link, website in targets:
+            if self.cache.contains(link):
+                with self._lock:
+                    self._stats['skipped_cached'] += 1
+                continue
+            key = canonical_link(link)
+            with self._lock:
+                if key in self._pending or len(self._pending) >= self.max_pending:
+                    self._stats['skipped_busy'] += 1
+                    continue
+                self._pending.add(key)
+                self._stats['issued'] += 1
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='article-prefetch')
+                executor = self._executor
+            executor.submit(self._run, link, website, key)
+
+    def _run(self, link, website, key):
+        try:
+            self.loader(link, website)
+        except Exception:
+            with self._lock:
+                self._stats['failed'] += 1
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._pending)
+        stats['enabled'] = self.enabled
+        stats['depth'] = self.depth
+        return stats
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""离线性能基准：用 bench/fixtures 下录制的页面代替真实网络，测量抓取与聚合的热点路径。
+
+用法（在仓库根目录执行）：
+    python bench/run_bench.py                     # 运行并与 bench/baseline.json 比较，退化时返回非0
+    python bench/run_bench.py --update-baseline   # 运行并覆盖基线
+    python bench/run_bench.py --stage fetch_news  # 只运行名称包含该字符串的阶段
+
+每个阶段先预热一次，再重复 --repeat 次取中位数耗时；另在 tracemalloc 下单独运行一次，
+记录峰值内存与新分配的内存块数。结果摘要（条数、长度等）也会与基线比较，用来发现提取结果的变化。
+基线中的耗时与机器有关，换机器后应先 --update-baseline。
+
+fixtures 中的页面按各来源真实页面的结构制作（标题为随机文本），央广网页面保持 GBK 编码。
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+FIXTURES_DIR = os.path.join(BENCH_DIR, 'fixtures')
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+
+sys.path.insert(0, ROOT_DIR)
+os.environ.setdefault('ARTICLE_PREFETCH', '0')
+
+import requests  # noqa: E402
+
+# 主机 -> (列表页, 正文页, Content-Type)；央广网页面为 GBK，只在 <meta> 中声明编码
+FIXTURES = {
+    'www.ctnews.com.cn': ('ctnews_list.html', 'ctnews_article.html', 'text/html; charset=utf-8'),
+    'travel.people.com.cn': ('people_list.html', 'people_article.html', 'text/html; charset=UTF-8'),
+    'travel.cnr.cn': ('cnr_list.html', 'cnr_article.html', 'text/html'),
+    # 微信专栏页使用仓库里已有的 wechat_debug.html
+    'mp.weixin.qq.com': (os.path.join(ROOT_DIR, 'wechat_debug.html'), None, 'text/html; charset=utf-8'),
+}
+
+_fixture_bytes = {}
+
+
+def _read_fixture(name):
+    if name not in _fixture_bytes:
+        with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+            _fixture_bytes[name] = f.read()
+    return _fixture_bytes[name]
+
+
+def fake_get(url, headers=None, timeout=10, **kwargs):
+    """代替网络请求：按主机返回录制的列表页或正文页"""
+    host = requests.utils.urlparse(url).netloc.lower()
+    response = requests.Response()
+    response.url = url
+    fixture = FIXTURES.get(host)
+    if fixture is None:
+        response.status_code = 404
+        response._content = b''
+        return response
+    list_page, article_page, content_type = fixture
+    is_article = article_page and ('/content/' in url or '/n1/' in url or url.endswith('.shtml'))
+    response.status_code = 200
+    response._content = _read_fixture(article_page if is_article else list_page)
+    response.headers['Content-Type'] = content_type
+    return response
+
+
+def load_app():
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+        import http_session
+    logging.getLogger().setLevel(logging.WARNING)
+    app.fetch_url = fake_get
+    http_session.get = fake_get
+    return app
+
+
+def build_stages(app):
+    import enhanced_reports
+
+    sites = list(app.websites)
+    lists = {}
+
+    def fetch_news(site):
+        def run():
+            with app._validators_lock:
+                app._crawl_validators.clear()  # 每次都完整解析，不走条件请求复用
+            items = app.fetch_news(site)
+            lists[site] = items
+            return len(items)
+        return run
+
+    def news_content(site):
+        def run():
+            link = lists[site][0]['link']
+            return len(app.get_news_content(link, site))
+        return run
+
+    def extract_dates():
+        links = [(item['link'], site) for site in sites for item in lists[site]]
+        dates = set()
+        for _ in range(20):
+            for link, site in links:
+                dates.add(app.extract_date_from_link(link, site))
+        return len(dates)
+
+    def filter_news(search_text):
+        def run():
+            merged = [item for site in sites for item in lists[site]]
+            return len(app.filter_news(merged, search_text))
+        return run
+
+    def route(path):
+        def run():
+            with app._views_lock:
+                app._views.clear()  # 测量聚合本身，而不是视图缓存命中
+            resp = app.app.test_client().get(path)
+            body = resp.get_data()
+            if resp.is_json:
+                return [resp.status_code, len(resp.get_json())]
+            return [resp.status_code, body.count(b'<item>') if path.startswith('/feed') else None]
+        return run
+
+    def wechat_album():
+        return len(enhanced_reports.enhanced_wechat_reports())
+
+    stages = []
+    for site in sites:
+        stages.append((f'fetch_news:{site}', fetch_news(site)))
+    for site in sites:
+        stages.append((f'get_news_content:{site}', news_content(site)))
+    stages.append(('extract_date_from_link', extract_dates))
+    stages.append(('filter_news:全部', filter_news('')))
+    stages.append(('filter_news:旅游', filter_news('旅游')))
+    # 聚合路由：来源缓存已预热，只清空视图
+    stages.append(('warm_cache', lambda: sum(len(app.get_news_with_cache(site, force_refresh=True)) for site in sites)))
+    stages.append(('route:/fetch_news', route('/fetch_news?website=全部来源')))
+    stages.append(('route:/fetch_news?search', route('/fetch_news?website=全部来源&search=旅游')))
+    stages.append(('route:/', route('/?website=全部来源&page=2')))
+    stages.append(('route:/export', route('/export?format=csv&website=全部来源')))
+    stages.append(('route:/feed.xml', route('/feed.xml?website=全部来源')))
+    stages.append(('wechat_album', wechat_album))
+    return stages
+
+
+def measure(fn, repeat):
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn()  # 预热
+        timings = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - t0) * 1000)
+
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        fn()
+        _current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+    new_blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'peak_kb': round(peak / 1024, 1),
+        'new_blocks': new_blocks,
+        'result': result,
+    }
+
+
+def compare(results, baseline, tolerance, mem_tolerance):
+    """返回退化项列表；耗时允许 tolerance 比例加 1ms 的抖动，峰值内存允许 mem_tolerance 比例"""
+    problems = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if current['result'] != base['result']:
+            problems.append(f"{name}: 结果变化 {base['result']!r} -> {current['result']!r}")
+        limit_ms = base['median_ms'] * (1 + tolerance) + 1.0
+        if current['median_ms'] > limit_ms:
+            problems.append(f"{name}: 耗时 {base['median_ms']}ms -> {current['median_ms']}ms (上限 {limit_ms:.1f}ms)")
+        limit_kb = base['peak_kb'] * (1 + mem_tolerance) + 64
+        if current['peak_kb'] > limit_kb:
+            problems.append(f"{name}: 峰值内存 {base['peak_kb']}KB -> {current['peak_kb']}KB (上限 {limit_kb:.0f}KB)")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='离线性能基准')
+    parser.add_argument('--repeat', type=int, default=7, help='每个阶段的计时次数（默认7）')
+    parser.add_argument('--stage', default='', help='只运行名称包含该字符串的阶段')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='允许的耗时退化比例（默认0.5）')
+    parser.add_argument('--mem-tolerance', type=float, default=0.25, help='允许的峰值内存增长比例（默认0.25）')
+    parser.add_argument('--update-baseline', action='store_true', help='用本次结果覆盖基线')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='基线文件路径')
+    args = parser.parse_args(argv)
+
+    app = load_app()
+    results = {}
+    print(f"{'阶段':<34}{'中位数ms':>10}{'最小ms':>10}{'峰值KB':>10}{'新内存块':>10}  结果")
+    for name, fn in build_stages(app):
+        if args.stage not in name:
+            # 后面的阶段依赖前面的抓取结果，未选中的阶段也执行一次，只是不计时
+            with contextlib.redirect_stdout(io.StringIO()):
+                fn()
+            continue
+        stats = measure(fn, args.repeat)
+        results[name] = stats
+        print(f"{name:<34}{stats['median_ms']:>10.2f}{stats['min_ms']:>10.2f}{stats['peak_kb']:>10.1f}"
+              f"{stats['new_blocks']:>10}  {stats['result']}")
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding='utf-8') as f:
+                baseline = json.load(f).get('stages', {})
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'stages': baseline}, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        print(f"基线已更新: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("没有基线文件，使用 --update-baseline 生成")
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f).get('stages', {})
+    problems = compare(results, baseline, args.tolerance, args.mem_tolerance)
+    if problems:
+        print("\n性能退化（REGRESSION）:")
+        for problem in problems:
+            print(f"  - {problem}")
+        return 1
+    print("\n与基线相比没有退化")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
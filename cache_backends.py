@@ -0,0 +1,499 @@
+"""缓存后端：多个 worker 进程共享抓取结果与跨进程锁。
+
+app 中的 _cache 与正文缓存仍是每个进程的一级缓存（保存解码后的数据与搜索索引）；
+后端是二级缓存，列表抓取结果与正文写入后端，其他进程在本地缓存缺失或过期时先从后端读取，
+同一来源、同一文章的抓取由后端的锁保证同时只在一个进程中进行。
+
+三种实现（CACHE_BACKEND）：
+- memory（默认）：进程内字典，不跨进程；app 只使用它的锁，数据仍只保存在本地缓存，行为与只有本地缓存时相同
+- sqlite:///相对路径 或 sqlite:////绝对路径：同一台机器上的多个进程共用一个 SQLite 文件（WAL）
+- redis://[:密码@]主机:端口/库号：Redis 协议（RESP），不依赖 redis 客户端库；
+  本地没有 Redis 时可运行 python cache_backends.py serve --port 6380 启动一个进程内存中的替代服务
+
+后端的值为 bytes，键加上 CACHE_KEY_PREFIX 前缀。读写失败时抛出 BackendError，由调用方降级为只用本地缓存。
+"""
+import abc
+import argparse
+import os
+import socket
+import socketserver
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from urllib.parse import unquote, urlsplit
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory').strip()
+CACHE_KEY_PREFIX = os.environ.get('CACHE_KEY_PREFIX', 'mypage:')
+# Redis 连接与单条命令的超时（秒）
+CACHE_BACKEND_TIMEOUT_S = float(os.environ.get('CACHE_BACKEND_TIMEOUT_S', '2'))
+# Redis 连接失败后暂停使用的秒数，期间的调用直接失败，不再逐个等待连接超时
+CACHE_BACKEND_RETRY_S = float(os.environ.get('CACHE_BACKEND_RETRY_S', '5'))
+
+
+class BackendError(Exception):
+    """后端不可用或返回错误"""
+
+
+class CacheBackend(abc.ABC):
+    """后端接口；ttl 以秒计，None 表示不过期。锁为带过期时间的互斥锁，持有者崩溃后到期自动释放"""
+
+    name = 'base'
+    shared = False  # 是否跨进程共享
+
+    def __init__(self, prefix=CACHE_KEY_PREFIX):
+        self.prefix = prefix
+        self._stats_lock = threading.Lock()
+        self._stats = {'gets': 0, 'hits': 0, 'sets': 0, 'deletes': 0,
+                       'locks_acquired': 0, 'locks_busy': 0, 'errors': 0}
+
+    def _count(self, field, amount=1):
+        with self._stats_lock:
+            self._stats[field] += amount
+
+    def _key(self, key):
+        return self.prefix + key
+
+    @abc.abstractmethod
+    def get(self, key):
+        """读取键的值（bytes），不存在或已过期时返回 None"""
+
+    @abc.abstractmethod
+    def set(self, key, value, ttl=None):
+        """写入键的值，ttl 秒后过期"""
+
+    @abc.abstractmethod
+    def delete(self, key):
+        """删除键（不存在时不做任何事）"""
+
+    @abc.abstractmethod
+    def acquire_lock(self, name, ttl):
+        """获取锁：成功返回令牌，已被其他持有者占用返回 None"""
+
+    @abc.abstractmethod
+    def release_lock(self, name, token):
+        """释放自己持有的锁（令牌不符时不做任何事）"""
+
+    @abc.abstractmethod
+    def clear(self, prefix=''):
+        """删除以 prefix 开头的全部键（只限本应用的键前缀之内）"""
+
+    def stats(self):
+        with self._stats_lock:
+            result = dict(self._stats)
+        result.update({'backend': self.name, 'shared': self.shared})
+        return result
+
+
+class MemoryBackend(CacheBackend):
+    name = 'memory'
+
+    def __init__(self, prefix=CACHE_KEY_PREFIX):
+        super().__init__(prefix)
+        self._data = {}  # key -> (value, expires_at 或 None)
+        self._lock = threading.Lock()
+
+    def _live(self, key, now):
+        item = self._data.get(key)
+        if item is not None and item[1] is not None and item[1] <= now:
+            del self._data[key]
+            return None
+        return item
+
+    def get(self, key):
+        self._count('gets')
+        with self._lock:
+            item = self._live(self._key(key), time.time())
+        if item is None:
+            return None
+        self._count('hits')
+        return item[0]
+
+    def set(self, key, value, ttl=None):
+        self._count('sets')
+        with self._lock:
+            self._data[self._key(key)] = (value, time.time() + ttl if ttl else None)
+
+    def delete(self, key):
+        self._count('deletes')
+        with self._lock:
+            self._data.pop(self._key(key), None)
+
+    def acquire_lock(self, name, ttl):
+        key = self._key('lock:' + name)
+        token = uuid.uuid4().hex
+        with self._lock:
+            if self._live(key, time.time()) is not None:
+                self._count('locks_busy')
+                return None
+            self._data[key] = (token.encode('ascii'), time.time() + ttl)
+        self._count('locks_acquired')
+        return token
+
+    def release_lock(self, name, token):
+        key = self._key('lock:' + name)
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] == token.encode('ascii'):
+                del self._data[key]
+
+    def clear(self, prefix=''):
+        full = self._key(prefix)
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(full)]:
+                del self._data[key]
+
+
+class SQLiteBackend(CacheBackend):
+    """同一台机器上的多个进程共用一个 SQLite 文件；过期的行在写入时顺带清理"""
+
+    name = 'sqlite'
+    shared = True
+
+    # 每写入多少次清理一次过期的行
+    _PURGE_EVERY = 200
+
+    def __init__(self, path, prefix=CACHE_KEY_PREFIX):
+        super().__init__(prefix)
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._writes = 0
+        self._run(lambda conn: conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)'))
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _run(self, fn):
+        try:
+            return fn(self._conn())
+        except sqlite3.Error as exc:
+            self._count('errors')
+            raise BackendError(f'sqlite: {exc}')
+
+    def get(self, key):
+        self._count('gets')
+        row = self._run(lambda conn: conn.execute(
+            'SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self._key(key), time.time())).fetchone())
+        if row is None:
+            return None
+        self._count('hits')
+        return bytes(row[0])
+
+    def set(self, key, value, ttl=None):
+        self._count('sets')
+        now = time.time()
+        self._writes += 1
+        purge = self._writes % self._PURGE_EVERY == 0
+
+        def write(conn):
+            conn.execute('INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+                         (self._key(key), value, now + ttl if ttl else None))
+            if purge:
+                conn.execute('DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?', (now,))
+
+        self._run(write)
+
+    def delete(self, key):
+        self._count('deletes')
+        self._run(lambda conn: conn.execute('DELETE FROM cache WHERE key = ?', (self._key(key),)))
+
+    def acquire_lock(self, name, ttl):
+        key = self._key('lock:' + name)
+        token = uuid.uuid4().hex
+        now = time.time()
+
+        def acquire(conn):
+            # BEGIN IMMEDIATE 取得写锁，清理过期锁与插入在同一事务中完成
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute('DELETE FROM cache WHERE key = ? AND expires <= ?', (key, now))
+                cur = conn.execute('INSERT OR IGNORE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+                                   (key, token.encode('ascii'), now + ttl))
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            return cur.rowcount == 1
+
+        if not self._run(acquire):
+            self._count('locks_busy')
+            return None
+        self._count('locks_acquired')
+        return token
+
+    def release_lock(self, name, token):
+        self._run(lambda conn: conn.execute('DELETE FROM cache WHERE key = ? AND value = ?',
+                                            (self._key('lock:' + name), token.encode('ascii'))))
+
+    def clear(self, prefix=''):
+        # LIKE 的通配符需要转义
+        pattern = self._key(prefix).replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        self._run(lambda conn: conn.execute("DELETE FROM cache WHERE key LIKE ? ESCAPE '\\'", (pattern,)))
+
+
+def _encode_command(args):
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode('utf-8')
+        elif isinstance(arg, int):
+            arg = str(arg).encode('ascii')
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(parts)
+
+
+def _read_reply(reader):
+    """读取一条 RESP 回复：错误回复以 BackendError 抛出"""
+    line = reader.readline()
+    if not line.endswith(b'\r\n'):
+        raise ConnectionError('连接已断开')
+    kind, body = line[:1], line[1:-2]
+    if kind == b'+':
+        return body.decode('utf-8')
+    if kind == b'-':
+        raise BackendError(body.decode('utf-8', 'replace'))
+    if kind == b':':
+        return int(body)
+    if kind == b'$':
+        length = int(body)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        if len(data) != length + 2:
+            raise ConnectionError('连接已断开')
+        return data[:-2]
+    if kind == b'*':
+        count = int(body)
+        return None if count < 0 else [_read_reply(reader) for _ in range(count)]
+    raise BackendError(f'无法解析的回复: {line[:40]!r}')
+
+
+class RedisBackend(CacheBackend):
+    """RESP 协议的最小客户端：每个线程一条连接，连接断开时重连一次"""
+
+    name = 'redis'
+    shared = True
+
+    def __init__(self, url, prefix=CACHE_KEY_PREFIX, timeout=CACHE_BACKEND_TIMEOUT_S):
+        super().__init__(prefix)
+        parts = urlsplit(url)
+        self.host = parts.hostname or 'localhost'
+        self.port = parts.port or 6379
+        self.password = unquote(parts.password) if parts.password else None
+        self.db = int(parts.path.lstrip('/') or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+        self._down_until = 0.0
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = (sock, sock.makefile('rb'))
+        if self.password:
+            self._roundtrip(conn, ('AUTH', self.password))
+        if self.db:
+            self._roundtrip(conn, ('SELECT', self.db))
+        return conn
+
+    def _roundtrip(self, conn, args):
+        conn[0].sendall(_encode_command(args))
+        return _read_reply(conn[1])
+
+    def _close(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn[1].close()
+                conn[0].close()
+            except OSError:
+                pass
+
+    def execute(self, *args):
+        if time.time() < self._down_until:
+            self._count('errors')
+            raise BackendError(f'redis {self.host}:{self.port}: 暂停使用（上次连接失败）')
+        for attempt in range(2):
+            try:
+                conn = getattr(self._local, 'conn', None)
+                if conn is None:
+                    conn = self._local.conn = self._connect()
+                return self._roundtrip(conn, args)
+            except BackendError:
+                self._count('errors')
+                raise
+            except (OSError, ValueError) as exc:
+                # 连接被服务端关闭等：重连后重试一次
+                self._close()
+                if attempt:
+                    self._count('errors')
+                    self._down_until = time.time() + CACHE_BACKEND_RETRY_S
+                    raise BackendError(f'redis {self.host}:{self.port}: {exc}')
+
+    def get(self, key):
+        self._count('gets')
+        value = self.execute('GET', self._key(key))
+        if value is not None:
+            self._count('hits')
+        return value
+
+    def set(self, key, value, ttl=None):
+        self._count('sets')
+        if ttl:
+            self.execute('SET', self._key(key), value, 'PX', max(int(ttl * 1000), 1))
+        else:
+            self.execute('SET', self._key(key), value)
+
+    def delete(self, key):
+        self._count('deletes')
+        self.execute('DEL', self._key(key))
+
+    def acquire_lock(self, name, ttl):
+        token = uuid.uuid4().hex
+        if self.execute('SET', self._key('lock:' + name), token, 'NX', 'PX', max(int(ttl * 1000), 1)) is None:
+            self._count('locks_busy')
+            return None
+        self._count('locks_acquired')
+        return token
+
+    def release_lock(self, name, token):
+        # 先比对令牌再删除；两步之间锁恰好过期并被他人取得的窗口可以忽略（锁的 TTL 远大于一次往返）
+        key = self._key('lock:' + name)
+        if self.execute('GET', key) == token.encode('ascii'):
+            self.execute('DEL', key)
+
+    def clear(self, prefix=''):
+        keys = self.execute('KEYS', self._key(prefix) + '*') or []
+        if keys:
+            self.execute('DEL', *keys)
+
+
+def from_url(url=CACHE_BACKEND):
+    """按 CACHE_BACKEND 的写法创建后端"""
+    if url in ('', 'memory'):
+        return MemoryBackend()
+    scheme = urlsplit(url).scheme
+    if scheme == 'sqlite':
+        return SQLiteBackend(url[len('sqlite:///'):])
+    if scheme == 'redis':
+        return RedisBackend(url)
+    raise ValueError(f'不支持的 CACHE_BACKEND: {url}')
+
+
+# --- Redis 协议的替代服务（本地开发与多 worker 测试用，数据只在该进程内存中） ---
+class _StandInState:
+    def __init__(self):
+        self.data = {}  # bytes key -> (bytes value, expires_at 或 None)
+        self.lock = threading.Lock()
+
+    def live(self, key):
+        item = self.data.get(key)
+        if item is not None and item[1] is not None and item[1] <= time.time():
+            del self.data[key]
+            return None
+        return item
+
+
+def _bulk(value):
+    return b'$-1\r\n' if value is None else b'$%d\r\n%s\r\n' % (len(value), value)
+
+
+class _StandInHandler(socketserver.StreamRequestHandler):
+    """支持 PING、GET、SET（EX/PX/NX/XX）、DEL、EXISTS、KEYS（仅前缀*）、DBSIZE、FLUSHDB，AUTH 与 SELECT 直接返回 OK"""
+
+    def handle(self):
+        while True:
+            try:
+                args = _read_reply(self.rfile)
+            except (ConnectionError, OSError, BackendError, ValueError):
+                return
+            if not isinstance(args, list) or not args:
+                return
+            command = args[0].upper()
+            if command == b'QUIT':
+                self.wfile.write(b'+OK\r\n')
+                return
+            try:
+                reply = self._dispatch(command, args[1:])
+            except (IndexError, ValueError):
+                reply = b'-ERR wrong number of arguments or syntax error\r\n'
+            self.wfile.write(reply)
+
+    def _dispatch(self, command, args):
+        state = self.server.state
+        with state.lock:
+            if command == b'PING':
+                return b'+PONG\r\n'
+            if command in (b'AUTH', b'SELECT'):
+                return b'+OK\r\n'
+            if command == b'GET':
+                item = state.live(args[0])
+                return _bulk(item[0] if item else None)
+            if command == b'SET':
+                key, value, options = args[0], args[1], [a.upper() for a in args[2:]]
+                expires_at = None
+                if b'PX' in options:
+                    expires_at = time.time() + int(args[2 + options.index(b'PX') + 1]) / 1000
+                elif b'EX' in options:
+                    expires_at = time.time() + int(args[2 + options.index(b'EX') + 1])
+                exists = state.live(key) is not None
+                if (b'NX' in options and exists) or (b'XX' in options and not exists):
+                    return b'$-1\r\n'
+                state.data[key] = (value, expires_at)
+                return b'+OK\r\n'
+            if command in (b'DEL', b'EXISTS'):
+                found = [key for key in args if state.live(key) is not None]
+                if command == b'DEL':
+                    for key in found:
+                        del state.data[key]
+                return b':%d\r\n' % len(found)
+            if command == b'KEYS':
+                prefix = args[0][:-1] if args[0].endswith(b'*') else args[0]
+                keys = [key for key in list(state.data) if key.startswith(prefix) and state.live(key) is not None]
+                return b'*%d\r\n' % len(keys) + b''.join(_bulk(key) for key in keys)
+            if command == b'DBSIZE':
+                return b':%d\r\n' % len(state.data)
+            if command == b'FLUSHDB':
+                state.data.clear()
+                return b'+OK\r\n'
+        return b'-ERR unknown command\r\n'
+
+
+class StandInServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, _StandInHandler)
+        self.state = _StandInState()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='缓存后端工具')
+    sub = parser.add_subparsers(dest='command', required=True)
+    serve = sub.add_parser('serve', help='启动 Redis 协议的替代服务')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=6380)
+    args = parser.parse_args(argv)
+
+    server = StandInServer((args.host, args.port))
+    print(f'redis://{args.host}:{args.port}/0')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""异步抓取引擎：列表页与正文页的请求在一个后台事件循环中调度。
+
+- 全局并发上限（CRAWL_CONCURRENCY）：同时在途的上游请求数
+- 重试退避用 asyncio.sleep 等待，不占用线程；判定规则与原先的同步重试相同
+- 单次调用时限（CRAWL_CALL_TIMEOUT_S）：一次 fetch（含全部重试）超过时限即按超时失败
+- 候选URL对冲：前一个候选失败、或超过 CRAWL_HEDGE_S 秒仍未返回时提前启动下一个；结果按候选顺序取用，
+  靠前的候选仍可能成功时等待它，慢但正常的首选不会输给回退候选
+- 同步桥接：run(coro) 在后台事件循环中执行协程并等待结果，供 Flask 路由与线程池中的代码调用
+
+请求默认经注入的同步发送函数（即 app.fetch_url → transport）在线程池中执行，录制/回放/故障注入照常生效；
+CRAWL_HTTP=aiohttp 且装了 aiohttp、传输层为 live 且未配置故障注入时，改用 aiohttp 直接发送。
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import os
+import random
+import threading
+from urllib.parse import urlsplit
+
+import requests
+
+import instrumentation
+import transport
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp 为可选依赖
+    aiohttp = None
+
+CRAWL_CONCURRENCY = int(os.environ.get('CRAWL_CONCURRENCY', '16'))
+CRAWL_CALL_TIMEOUT_S = float(os.environ.get('CRAWL_CALL_TIMEOUT_S', '30'))
+CRAWL_HEDGE_S = float(os.environ.get('CRAWL_HEDGE_S', '1.5'))
+CRAWL_HTTP = os.environ.get('CRAWL_HTTP', 'thread').strip().lower()
+
+
+class CrawlEngine:
+    def __init__(self, send, concurrency=CRAWL_CONCURRENCY, call_timeout=CRAWL_CALL_TIMEOUT_S):
+        self._send = send  # 同步的单次请求：send(url, headers, timeout) -> requests.Response
+        self.concurrency = concurrency
+        self.call_timeout = call_timeout
+        self._loop = None
+        self._thread = None
+        self._semaphore = None  # 在事件循环线程中创建
+        self._send_executor = None  # 同步发送专用的线程池，与事件循环一起创建
+        self._session = None    # aiohttp 会话，首次使用时创建
+        self._lock = threading.Lock()
+        self._stats = {
+            'attempts': 0,
+            'retries': 0,
+            'backoff_s': 0.0,
+            'exhausted': 0,
+            'call_timeouts': 0,
+            'in_flight': 0,
+            'hedged': 0,  # 因前一个候选过慢而提前启动的候选数
+        }
+
+    def _count(self, field, amount=1):
+        with self._lock:
+            self._stats[field] += amount
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                # 解析、写缓存等 to_thread 任务在默认线程池中执行；同步发送使用单独的线程池，
+                # 被放弃的慢请求不会占满默认线程池
+                loop.set_default_executor(concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.concurrency + 4, thread_name_prefix='crawl'))
+                self._send_executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.concurrency, thread_name_prefix='crawl-send')
+                ready = threading.Event()
+
+                def main():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=main, name='crawl-loop', daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    def run(self, coro, timeout=None):
+        """同步桥接：在后台事件循环中执行协程并等待结果（不能在事件循环线程中调用）"""
+        loop = self._ensure_loop()
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError('不能在抓取引擎的事件循环线程中同步等待')
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def _limiter(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    async def fetch(self, url, headers=None, timeout=10, retries=3):
+        """请求 url：200 且有正文或 304 即返回，否则指数退避后重试；整个调用受 call_timeout 限制"""
+        try:
+            return await asyncio.wait_for(self._fetch_with_retries(url, headers, timeout, retries), self.call_timeout)
+        except asyncio.TimeoutError:
+            self._count('call_timeouts')
+            raise requests.Timeout(f'抓取超过 {self.call_timeout}s: {url}')
+
+    async def _fetch_with_retries(self, url, headers, timeout, retries):
+        last_exc = None
+        for attempt in range(retries):
+            try:
+                resp = await self._attempt(url, headers, timeout)
+                if resp.status_code == 200 and resp.content:
+                    return resp
+                if resp.status_code == 304:
+                    # 条件请求命中：内容未变化，无需重试
+                    return resp
+                # 对于非常短的响应或临时错误，触发重试
+            except Exception as exc:
+                last_exc = exc
+            # 指数退避 + 轻微抖动
+            backoff_s = (2 ** attempt) * 0.3 + random.uniform(0.05, 0.2)
+            self._count('retries')
+            self._count('backoff_s', backoff_s)
+            instrumentation.UPSTREAM_RETRIES.inc(host=urlsplit(url).netloc.lower())
+            await asyncio.sleep(backoff_s)
+        self._count('exhausted')
+        # 最后一次尝试，直接抛出或返回占位响应
+        if last_exc:
+            raise last_exc
+        return await self._attempt(url, headers, timeout)
+
+    async def _attempt(self, url, headers, timeout):
+        self._count('attempts')
+        if CRAWL_HTTP == 'aiohttp' and aiohttp is not None and transport.passthrough():
+            async with self._limiter():
+                self._count('in_flight')
+                try:
+                    return await self._aiohttp_get(url, headers, timeout)
+                finally:
+                    self._count('in_flight', -1)
+        return await self._send_in_thread(url, headers, timeout)
+
+    async def _send_in_thread(self, url, headers, timeout):
+        """在发送线程池中执行同步请求。线程中的请求无法取消：调用超时后协程放弃等待，
+        但信号量名额与 in_flight 计数保持到线程真正结束才释放，在途请求数不会超过并发上限"""
+        limiter = self._limiter()
+        await limiter.acquire()
+        loop = asyncio.get_running_loop()
+        self._count('in_flight')
+
+        def finished(_future):
+            self._count('in_flight', -1)
+            loop.call_soon_threadsafe(limiter.release)
+
+        try:
+            # 复制上下文，请求中的 span 仍记到发起请求的轨迹上
+            future = self._send_executor.submit(contextvars.copy_context().run, self._send, url, headers, timeout)
+        except BaseException:
+            finished(None)
+            raise
+        future.add_done_callback(finished)
+        return await asyncio.wrap_future(future)
+
+    async def _aiohttp_get(self, url, headers, timeout):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.concurrency))
+        host = urlsplit(url).netloc.lower()
+        client_timeout = aiohttp.ClientTimeout(sock_connect=timeout, sock_read=timeout)
+        try:
+            with instrumentation.stage('download', host):
+                async with self._session.get(transport.target_for(url), headers=headers, timeout=client_timeout) as resp:
+                    content = await resp.read()
+                    response = transport.build_response(str(resp.url), resp.status, dict(resp.headers), content)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            instrumentation.UPSTREAM_ERRORS.inc(host=host, error=type(exc).__name__)
+            raise
+        instrumentation.UPSTREAM_RESPONSES.inc(host=host, status=response.status_code)
+        return response
+
+    async def first_success(self, candidates, attempt, hedge=CRAWL_HEDGE_S):
+        """按顺序启动候选：前一个失败或超过 hedge 秒仍未完成时提前启动下一个。
+
+        attempt(下标, 候选) 返回可用结果或 None；返回 (下标, 结果)。结果按候选顺序取用：
+        靠前的候选都已失败时，第一个可用结果胜出（提前启动的候选只是预热，靠前的候选仍在进行时等待它），
+        其余仍在进行的候选被取消；全部不可用时返回 (None, None)。
+        """
+        pending = {}  # task -> 下标
+        results = {}  # 下标 -> 可用结果，等待靠前的候选结束
+        failed = set()
+        launched = 0
+
+        def launch():
+            nonlocal launched
+            task = asyncio.ensure_future(attempt(launched, candidates[launched]))
+            pending[task] = launched
+            launched += 1
+
+        launch()
+        try:
+            while pending:
+                # 已有可用结果时不再提前启动更多候选
+                more = launched < len(candidates) and not results
+                done, _ = await asyncio.wait(list(pending), timeout=hedge if more else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self._count('hedged')
+                    launch()
+                    continue
+                newly_failed = False
+                for task in done:
+                    index = pending.pop(task)
+                    result = None if task.cancelled() or task.exception() else task.result()
+                    if result is None:
+                        failed.add(index)
+                        newly_failed = True
+                    else:
+                        results[index] = result
+                for index in range(launched):
+                    if index in results:
+                        return index, results[index]
+                    if index not in failed:
+                        break  # 靠前的候选仍在进行
+                if newly_failed and launched < len(candidates):
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+        return None, None
+
+    def stats(self):
+        with self._lock:
+            result = dict(self._stats)
+        result['backoff_s'] = round(result['backoff_s'], 3)
+        result['concurrency'] = self.concurrency
+        result['call_timeout_s'] = self.call_timeout
+        result['http'] = 'aiohttp' if CRAWL_HTTP == 'aiohttp' and aiohttp is not None else 'thread'
+        return result
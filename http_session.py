@@ -0,0 +1,155 @@
+"""共享HTTP会话层：按主机复用 requests.Session 及其 keep-alive 连接池。
+
+fetch_url（抓取引擎的发送函数）与公司周报抓取都通过这里发请求，
+避免每次调用都重新进行 TCP/TLS 握手。
+"""
+import http.cookiejar
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+import instrumentation
+
+# 连接池配置：每个主机的连接池个数、每个池保留的最大连接数、池满时是否阻塞等待
+HTTP_POOL_CONNECTIONS = int(os.environ.get('HTTP_POOL_CONNECTIONS', '4'))
+HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', '8'))
+HTTP_POOL_BLOCK = os.environ.get('HTTP_POOL_BLOCK', '0') == '1'
+
+_sessions = {}  # scheme://host -> requests.Session
+_lock = threading.Lock()
+_stats = {
+    'session_hits': 0,    # 复用已有会话
+    'session_misses': 0,  # 新建会话
+}
+
+
+def _host_key(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}"
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    """记录建立连接（DNS 解析 + TCP 握手）的耗时"""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            instrumentation.UPSTREAM_CONNECT_SECONDS.observe(time.perf_counter() - started, host=self.host)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    """记录建立连接（DNS 解析 + TCP 握手 + TLS 握手）的耗时"""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            instrumentation.UPSTREAM_CONNECT_SECONDS.observe(time.perf_counter() - started, host=self.host)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedAdapter(HTTPAdapter):
+    """连接池使用计时的连接类"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+
+def _new_session():
+    session = requests.Session()
+    adapter = _TimedAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        pool_block=HTTP_POOL_BLOCK,
+        max_retries=0,  # 重试由抓取引擎（crawl_engine）负责
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['Connection'] = 'keep-alive'
+    # 会话只用于复用连接，不保存 Cookie：与原先每次 requests.get 一样，各请求之间（以及经代理时各来源之间）互不影响
+    session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+
+def get_session(url):
+    """返回目标主机共享的会话，不存在时创建（线程安全）"""
+    key = _host_key(url)
+    with _lock:
+        session = _sessions.get(key)
+        if session is not None:
+            _stats['session_hits'] += 1
+            return session
+        _stats['session_misses'] += 1
+        session = _new_session()
+        _sessions[key] = session
+        return session
+
+
+def get(url, **kwargs):
+    """与 requests.get 用法相同，但复用主机级连接池"""
+    return get_session(url).get(url, **kwargs)
+
+
+def pool_stats():
+    """连接池统计：按主机统计请求数，复用已有连接计为命中，新建连接计为未命中"""
+    with _lock:
+        stats = dict(_stats)
+        sessions = list(_sessions.items())
+
+    hosts = {}
+    for key, session in sessions:
+        num_requests = 0
+        num_connections = 0
+        adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+        for adapter in adapters.values():
+            pools = adapter.poolmanager.pools
+            for pool_key in pools.keys():
+                pool = pools.get(pool_key)
+                if pool is None:
+                    continue
+                num_requests += pool.num_requests
+                num_connections += pool.num_connections
+        hosts[key] = {
+            'requests': num_requests,
+            'pool_hits': max(num_requests - num_connections, 0),
+            'pool_misses': num_connections,
+        }
+
+    stats['pool_hits'] = sum(h['pool_hits'] for h in hosts.values())
+    stats['pool_misses'] = sum(h['pool_misses'] for h in hosts.values())
+    stats['hosts'] = hosts
+    stats['config'] = {
+        'pool_connections': HTTP_POOL_CONNECTIONS,
+        'pool_maxsize': HTTP_POOL_MAXSIZE,
+        'pool_block': HTTP_POOL_BLOCK,
+    }
+    return stats
+
+
+def close_all():
+    """关闭所有会话（进程退出或测试时使用）"""
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
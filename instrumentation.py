@@ -0,0 +1,182 @@
+"""进程内指标：计数器与直方图，可导出为 Prometheus 文本格式。
+
+不依赖 prometheus_client；指标在模块加载时注册，/metrics?format=prometheus 输出全部指标。
+直方图同时提供按桶插值的分位数估计，供 /metrics 的 JSON 输出使用。
+"""
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# 默认耗时分桶（秒）
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}  # 标签值元组 -> 数值或桶计数
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return {key: value for key, value in self._values.items()}
+
+    def expose(self):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in sorted(self.snapshot().items())]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            state['counts'][index] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self):
+        with self._lock:
+            return {key: {'counts': list(state['counts']), 'sum': state['sum'], 'count': state['count']}
+                    for key, state in self._values.items()}
+
+    def quantile(self, state, q):
+        """按桶线性插值估计分位数（与 Prometheus histogram_quantile 的做法相同）"""
+        if not state['count']:
+            return None
+        rank = q * state['count']
+        cumulative = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, state['counts']):
+            if count and cumulative + count >= rank:
+                return lower + (bound - lower) * (rank - cumulative) / count
+            cumulative += count
+            lower = bound
+        return self.buckets[-1]  # 落在 +Inf 桶时取最大的有限上界
+
+    def summary(self):
+        """JSON 用的摘要：{标签: {count, avg_ms, p50_ms, p90_ms, p99_ms}}"""
+        result = {}
+        for key, state in sorted(self.snapshot().items()):
+            label = ' '.join(v for v in key if v) or 'all'
+            result[label] = {
+                'count': state['count'],
+                'avg_ms': round(state['sum'] / state['count'] * 1000, 2) if state['count'] else None,
+                **{f'p{int(q * 100)}_ms': round(self.quantile(state, q) * 1000, 2) for q in (0.5, 0.9, 0.99)},
+            }
+        return result
+
+    def expose(self):
+        lines = []
+        for key, state in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), state['counts']):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(state["sum"])}')
+            lines.append(f'{self.name}_count{labels} {state["count"]}')
+        return lines
+
+
+def render_prometheus():
+    """全部已注册指标的 Prometheus 文本格式（text/plain; version=0.0.4）"""
+    lines = []
+    for metric in _registry:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(metric.expose())
+    return '\n'.join(lines) + '\n'
+
+
+# --- 指标定义 ---
+
+# 抓取各阶段：download（source 为上游主机）、decode、parse、select、article_decode、article_parse、
+# date_extract、filter；建立连接的耗时单独记在 UPSTREAM_CONNECT_SECONDS
+CRAWL_STAGE_SECONDS = Histogram('news_crawl_stage_seconds', '抓取与处理各阶段耗时', ['stage', 'source'])
+UPSTREAM_CONNECT_SECONDS = Histogram('news_upstream_connect_seconds', '建立上游连接耗时（DNS+TCP+TLS）', ['host'])
+ROUTE_SECONDS = Histogram('news_http_request_duration_seconds', '路由处理耗时', ['route', 'method', 'status'])
+
+CACHE_REQUESTS = Counter('news_cache_requests_total', '来源缓存查询结果', ['source', 'result'])
+UPSTREAM_RESPONSES = Counter('news_upstream_responses_total', '上游响应状态码', ['host', 'status'])
+UPSTREAM_ERRORS = Counter('news_upstream_errors_total', '上游请求异常（超时、连接失败等）', ['host', 'error'])
+UPSTREAM_RETRIES = Counter('news_upstream_retries_total', '抓取引擎（crawl_engine）的重试次数', ['host'])
+CRAWL_FALLBACK = Counter('news_crawl_fallback_total', '列表页候选URL使用情况', ['source', 'outcome'])
+
+
+def stage(name, source=''):
+    """计时一个抓取阶段：with stage('parse', website): ..."""
+    return CRAWL_STAGE_SECONDS.time(stage=name, source=source)
+
+
+def timed(name):
+    """把整个函数计为一个抓取阶段的装饰器"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
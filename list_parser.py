@@ -0,0 +1,492 @@
+"""列表页链接快速提取。
+
+fetch_news 原来对整页建 BeautifulSoup 树，再对每个选择器各做一次全树 soup.select。
+这里改为一次遍历文档事件流：
+- 解析后端可插拔：默认标准库 html.parser；LIST_PARSER=lxml 且装了 lxml 时改用 lxml 的事件接口（更快，
+  但 libxml2 会修正不规范的嵌套，个别页面结果可能与原来不同），未安装 lxml 时退回 html.parser
+- 只为选择器命中的 <a> 构建轻量节点（相当于 SoupStrainer），其余元素只在祖先栈中保留标签名和属性
+- 站点配置的所有选择器在同一次遍历中匹配，结果按选择器分别收集，文档顺序与 soup.select 一致
+
+html.parser 后端按 BeautifulSoup 的建树规则处理事件（空元素不入栈、结束标签弹出到最近的同名标签、
+纯空白文本折叠、script/style 等内容不计入文本），因此结果与原来逐个 soup.select 的结果一致。
+支持的选择器：标签、.class、#id、[attr]、[attr=|^=|$=|*=|~=v]、:not(...)、后代与子代组合、逗号分组，
+且最右侧必须是 a 标签；其他选择器交给 BeautifulSoup 兜底。
+"""
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+from bs4.builder import HTMLTreeBuilder
+from bs4.dammit import EntitySubstitution
+
+try:
+    from lxml import etree as _lxml_etree
+except ImportError:  # lxml 为可选依赖
+    _lxml_etree = None
+
+# 列表页解析方式：html.parser（默认）、lxml（未安装时退回 html.parser）、soup（原 BeautifulSoup 逐个 select）
+LIST_PARSER = os.environ.get('LIST_PARSER', 'html.parser').strip().lower()
+
+_EMPTY_ELEMENT_TAGS = frozenset(HTMLTreeBuilder.empty_element_tags)
+_PRESERVE_WHITESPACE_TAGS = frozenset(HTMLTreeBuilder.DEFAULT_PRESERVE_WHITESPACE_TAGS)
+_STRING_CONTAINER_TAGS = frozenset(HTMLTreeBuilder.DEFAULT_STRING_CONTAINERS)
+_ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+
+
+def backend_name():
+    """实际使用的解析后端"""
+    if LIST_PARSER == 'soup':
+        return 'soup'
+    if LIST_PARSER == 'lxml' and _lxml_etree is not None:
+        return 'lxml'
+    return 'html.parser'
+
+
+# --- 选择器编译 ---
+
+class UnsupportedSelector(ValueError):
+    pass
+
+
+_TOKEN_RE = re.compile(r'''
+    (?P<comma>\s*,\s*)
+  | (?P<close>\s*\))
+  | (?P<ws>\s*>\s*|\s+)
+  | (?P<tag>\*|[a-zA-Z][\w-]*)
+  | (?P<cls>\.[\w-]+)
+  | (?P<id>\#[\w-]+)
+  | (?P<attrsel>\[\s*(?P<attr>[\w-]+)\s*(?:(?P<op>[\^$*~]?=)\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<bare>[\w-]+))\s*)?\])
+  | (?P<not>:not\(\s*)
+''', re.VERBOSE)
+
+
+class _Compound:
+    """一个复合选择器：标签 + 若干条件（类、id、属性、:not）"""
+    __slots__ = ('tag', 'conditions')
+
+    def __init__(self):
+        self.tag = None
+        self.conditions = []
+
+    def matches(self, name, attrs):
+        if self.tag is not None and self.tag != name:
+            return False
+        for cond in self.conditions:
+            if not cond(name, attrs):
+                return False
+        return True
+
+
+def _attr_value(attrs, name):
+    value = attrs.get(name)
+    if value is not None and name == 'class':
+        value = ' '.join(value.split())  # 与 BeautifulSoup 多值属性拼接后的值一致
+    return value
+
+
+def _attr_condition(name, op, expected):
+    if op is None:
+        return lambda tag, attrs: name in attrs
+    if op == '=':
+        return lambda tag, attrs: _attr_value(attrs, name) == expected
+    if not expected:
+        return lambda tag, attrs: False  # 空值的 ^= $= *= ~= 不匹配任何元素
+    if op == '^=':
+        return lambda tag, attrs: (_attr_value(attrs, name) or '').startswith(expected)
+    if op == '$=':
+        return lambda tag, attrs: (_attr_value(attrs, name) or '').endswith(expected)
+    if op == '*=':
+        return lambda tag, attrs: expected in (_attr_value(attrs, name) or '')
+    if any(ch.isspace() for ch in expected):
+        return lambda tag, attrs: False
+    return lambda tag, attrs: expected in (_attr_value(attrs, name) or '').split()
+
+
+def _class_condition(cls):
+    return lambda tag, attrs: cls in attrs.get('class', '').split()
+
+
+def _id_condition(ident):
+    return lambda tag, attrs: attrs.get('id') == ident
+
+
+def _not_condition(compounds):
+    return lambda tag, attrs: not any(c.matches(tag, attrs) for c in compounds)
+
+
+class _Parser:
+    """把选择器字符串解析为 [[(组合符, 复合选择器), ...], ...]（逗号分组，每组从左到右）"""
+
+    def __init__(self, css):
+        self.css = css.strip()
+        self.pos = 0
+
+    def fail(self):
+        raise UnsupportedSelector(self.css)
+
+    def next_token(self):
+        if self.pos >= len(self.css):
+            return None
+        m = _TOKEN_RE.match(self.css, self.pos)
+        if not m:
+            self.fail()
+        self.pos = m.end()
+        return m
+
+    def parse_group(self, nested=False):
+        groups = [[]]
+        combinator = None
+        compound = None
+        while True:
+            m = self.next_token()
+            if m is None or m.lastgroup in ('comma', 'close'):
+                if compound is None:
+                    self.fail()
+                groups[-1].append((combinator, compound))
+                if m is None:
+                    if nested:
+                        self.fail()
+                    return groups
+                if m.lastgroup == 'close':
+                    if not nested:
+                        self.fail()
+                    return groups
+                groups.append([])
+                combinator = compound = None
+                continue
+            kind = m.lastgroup
+            if kind == 'ws':
+                if compound is None:
+                    if groups[-1] or combinator is not None:
+                        self.fail()
+                    continue  # 开头的空白
+                if nested:
+                    self.fail()  # :not() 中只支持复合选择器
+                groups[-1].append((combinator, compound))
+                combinator = '>' if '>' in m.group() else ' '
+                compound = None
+                continue
+            if compound is None:
+                compound = _Compound()
+            if kind == 'tag':
+                if compound.tag is not None or compound.conditions:
+                    self.fail()
+                compound.tag = None if m.group('tag') == '*' else m.group('tag').lower()
+            elif kind == 'cls':
+                compound.conditions.append(_class_condition(m.group('cls')[1:]))
+            elif kind == 'id':
+                compound.conditions.append(_id_condition(m.group('id')[1:]))
+            elif kind == 'attrsel':
+                value = m.group('dq')
+                if value is None:
+                    value = m.group('sq')
+                if value is None:
+                    value = m.group('bare')
+                compound.conditions.append(_attr_condition(m.group('attr').lower(), m.group('op'), value))
+            elif kind == 'not':
+                compound.conditions.append(_not_condition([group[0][1] for group in self.parse_group(nested=True)]))
+            else:
+                self.fail()
+
+
+class Selector:
+    """编译后的选择器，match(name, attrs, ancestors) 判断元素是否命中"""
+
+    def __init__(self, css):
+        self.css = css
+        self.alternatives = []
+        for group in _Parser(css).parse_group():
+            subject = group[-1][1]
+            if subject.tag != 'a':
+                raise UnsupportedSelector(css)  # 只为 <a> 建节点
+            # 从右往左：[(组合符, 左侧复合选择器), ...]
+            steps = [(group[i + 1][0], group[i][1]) for i in range(len(group) - 2, -1, -1)]
+            self.alternatives.append((subject, steps))
+
+    def match(self, name, attrs, ancestors):
+        for subject, steps in self.alternatives:
+            if subject.matches(name, attrs) and _match_steps(steps, 0, ancestors, len(ancestors)):
+                return True
+        return False
+
+
+def _match_steps(steps, i, ancestors, end):
+    if i == len(steps):
+        return True
+    combinator, compound = steps[i]
+    if combinator == '>':
+        j = end - 1
+        return j >= 0 and compound.matches(ancestors[j][0], ancestors[j][1]) and _match_steps(steps, i + 1, ancestors, j)
+    for j in range(end - 1, -1, -1):
+        if compound.matches(ancestors[j][0], ancestors[j][1]) and _match_steps(steps, i + 1, ancestors, j):
+            return True
+    return False
+
+
+@lru_cache(maxsize=128)
+def compile_selector(css):
+    """编译选择器；不支持时返回 None"""
+    try:
+        return Selector(css)
+    except UnsupportedSelector:
+        return None
+
+
+# --- 轻量节点与事件处理 ---
+
+class Anchor:
+    """命中的 <a> 元素：提供 fetch_news 用到的 get()/text，与 bs4 Tag 用法一致"""
+    __slots__ = ('name', 'attrs', '_parts')
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self._parts = []
+
+    def get(self, key, default=None):
+        if key == 'class' and 'class' in self.attrs:
+            return self.attrs['class'].split()
+        return self.attrs.get(key, default)
+
+    @property
+    def text(self):
+        return ''.join(self._parts)
+
+    def __repr__(self):
+        return f"<Anchor href={self.attrs.get('href')!r} text={self.text[:30]!r}>"
+
+
+class _Collector:
+    """按 BeautifulSoup 的建树规则消费 start/end/data 事件，只为命中的 <a> 收集文本"""
+
+    def __init__(self, selectors):
+        self.selectors = selectors
+        self.results = [[] for _ in selectors]
+        self.stack = []  # [(name, attrs, anchor或None)]
+        self.open_counter = Counter()
+        self.open_anchors = []
+        self.preserve_depth = 0
+        self.container_depth = 0
+        self.pending = []
+
+    def start(self, name, attrs):
+        self.flush()
+        anchor = None
+        if name == 'a':
+            for i, selector in enumerate(self.selectors):
+                if selector.match(name, attrs, self.stack):
+                    if anchor is None:
+                        anchor = Anchor(name, attrs)
+                    self.results[i].append(anchor)
+            if anchor is not None:
+                self.open_anchors.append(anchor)
+        self.stack.append((name, attrs, anchor))
+        self.open_counter[name] += 1
+        if name in _PRESERVE_WHITESPACE_TAGS:
+            self.preserve_depth += 1
+        if name in _STRING_CONTAINER_TAGS:
+            self.container_depth += 1
+
+    def end(self, name):
+        self.flush()
+        if not self.open_counter[name]:
+            return
+        while self.stack:
+            popped = self._pop()
+            if popped == name:
+                break
+
+    def _pop(self):
+        name, _attrs, anchor = self.stack.pop()
+        self.open_counter[name] -= 1
+        if name in _PRESERVE_WHITESPACE_TAGS:
+            self.preserve_depth -= 1
+        if name in _STRING_CONTAINER_TAGS:
+            self.container_depth -= 1
+        if anchor is not None:
+            self.open_anchors.remove(anchor)
+        return name
+
+    def data(self, text):
+        if self.open_anchors:
+            self.pending.append(text)
+
+    def flush(self, counted=True):
+        """结束当前文本段：counted=False 表示注释、声明等不计入 .text 的内容"""
+        if not self.pending:
+            return
+        text = ''.join(self.pending)
+        self.pending = []
+        if not counted:
+            return
+        if not self.preserve_depth and not text.strip(_ASCII_SPACES):
+            text = '\n' if '\n' in text else ' '
+        for anchor in self.open_anchors:
+            anchor._parts.append(text)
+
+    def close(self):
+        self.flush()
+        del self.stack[:]
+        del self.open_anchors[:]
+        return self.results
+
+
+class _HTMLParserBackend(HTMLParser):
+    """标准库 html.parser 事件，按 bs4 BeautifulSoupHTMLParser 的方式转发"""
+
+    def __init__(self, collector):
+        super().__init__(convert_charrefs=False)
+        self.collector = collector
+        self.already_closed_empty_element = []
+
+    def handle_startendtag(self, name, attrs):
+        self.handle_starttag(name, attrs, handle_empty_element=False)
+        self.handle_endtag(name)
+
+    def handle_starttag(self, name, attrs, handle_empty_element=True):
+        self.collector.start(name, {key: '' if value is None else value for key, value in attrs})
+        if handle_empty_element and name in _EMPTY_ELEMENT_TAGS:
+            self.handle_endtag(name, check_already_closed=False)
+            self.already_closed_empty_element.append(name)
+
+    def handle_endtag(self, name, check_already_closed=True):
+        if check_already_closed and name in self.already_closed_empty_element:
+            self.already_closed_empty_element.remove(name)
+        else:
+            self.collector.end(name)
+
+    def handle_data(self, data):
+        # script/style 等容器内的文本不计入 .text（bs4 中为 Script/Stylesheet 等字符串类型）
+        if self.collector.container_depth:
+            self.collector.flush()
+            self.collector.data(data)
+            self.collector.flush(counted=False)
+        else:
+            self.collector.data(data)
+
+    def handle_charref(self, name):
+        if name.startswith(('x', 'X')):
+            code = int(name.lstrip('xX'), 16)
+        else:
+            code = int(name)
+        data = None
+        if code < 256:
+            try:
+                data = bytearray([code]).decode('windows-1252')
+            except UnicodeDecodeError:
+                pass
+        if not data:
+            try:
+                data = chr(code)
+            except (ValueError, OverflowError):
+                pass
+        self.handle_data(data or '\N{REPLACEMENT CHARACTER}')
+
+    def handle_entityref(self, name):
+        character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+        self.handle_data(character if character is not None else f'&{name}')
+
+    def handle_comment(self, data):
+        self._skip(data)
+
+    def handle_decl(self, data):
+        self._skip(data)
+
+    def handle_pi(self, data):
+        self._skip(data)
+
+    def unknown_decl(self, data):
+        if data.upper().startswith('CDATA['):
+            # CDATA 段在 bs4 中计入 .text
+            self.collector.flush()
+            self.collector.data(data[len('CDATA['):])
+            self.collector.flush()
+        else:
+            self._skip(data)
+
+    def _skip(self, data):
+        self.collector.flush()
+        self.collector.data(data)
+        self.collector.flush(counted=False)
+
+
+def _parse_html_parser(html, collector):
+    parser = _HTMLParserBackend(collector)
+    parser.feed(html)
+    parser.close()
+
+
+class _LxmlTarget:
+    """lxml 解析器的 target：事件已由 libxml2 配平，直接转发"""
+
+    def __init__(self, collector):
+        self.collector = collector
+
+    def start(self, tag, attrib):
+        self.collector.start(tag, dict(attrib))
+
+    def end(self, tag):
+        self.collector.end(tag)
+
+    def data(self, data):
+        collector = self.collector
+        if collector.container_depth:
+            collector.flush()
+            collector.data(data)
+            collector.flush(counted=False)
+        else:
+            collector.data(data)
+
+    def comment(self, text):
+        self.collector.flush()
+
+    def close(self):
+        return None
+
+
+def _parse_lxml(html, collector):
+    parser = _lxml_etree.HTMLParser(target=_LxmlTarget(collector), no_network=True)
+    parser.feed(html)
+    parser.close()
+
+
+# --- 对外接口 ---
+
+class ListPage:
+    """一次解析得到的各选择器匹配结果；select(css) 与 soup.select(css) 等价"""
+
+    def __init__(self, html, selectors, backend=None):
+        self.html = html
+        self.backend = backend or backend_name()
+        self._soup = None
+        self._matches = {}
+        compiled = []
+        if self.backend != 'soup':
+            for css in dict.fromkeys(selectors):
+                selector = compile_selector(css)
+                if selector is not None:
+                    compiled.append(selector)
+        if compiled:
+            collector = _Collector(compiled)
+            if self.backend == 'lxml':
+                _parse_lxml(html, collector)
+            else:
+                _parse_html_parser(html, collector)
+            for selector, nodes in zip(compiled, collector.close()):
+                self._matches[selector.css] = nodes
+
+    def select(self, css):
+        nodes = self._matches.get(css)
+        if nodes is not None:
+            return list(nodes)
+        # 不支持的选择器：按需建一次 BeautifulSoup 树兜底
+        if self._soup is None:
+            self._soup = BeautifulSoup(self.html, 'html.parser')
+        return self._soup.select(css)
+
+
+def parse_list_page(html, selectors, backend=None):
+    return ListPage(html, selectors, backend)
@@ -0,0 +1,143 @@
+"""抓取调度器：按各自的间隔刷新每个来源和公司周报，与用户请求解耦。
+
+三种运行方式（SCHEDULER_MODE）：
+- off（默认）：不调度，仍由请求触发抓取
+- thread：Web 进程内的后台线程按间隔执行到期任务
+- cron：由外部定时请求 /cron/crawl 触发（Vercel Cron 等无常驻进程的部署）
+另可作为独立进程运行：python scheduler.py（循环执行），python scheduler.py --once（执行一次全部任务后退出）。
+
+thread/cron 模式下，请求处理只读取已有缓存（无论新旧），上游抓取只在缓存为空时才在请求中发生。
+独立进程与 Web 进程不共享内存，需设置可跨进程共享的缓存后端（CACHE_BACKEND=sqlite/redis）才能让 Web 进程读到它的结果。
+"""
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+SCHEDULER_MODE = os.environ.get('SCHEDULER_MODE', 'off').strip().lower()
+SCHEDULER_WORKERS = int(os.environ.get('SCHEDULER_WORKERS', '4'))
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    def __init__(self, name, interval, fn):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self.next_due = 0.0  # 首次立即执行
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.last_run = None
+        self.last_duration_ms = None
+        self.last_error = None
+
+
+class Scheduler:
+    def __init__(self, workers=SCHEDULER_WORKERS):
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scheduler')
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add(self, name, interval, fn):
+        """注册任务：每 interval 秒执行一次 fn()"""
+        with self._lock:
+            self._jobs[name] = Job(name, interval, fn)
+
+    def _run_job(self, job):
+        started = time.time()
+        try:
+            job.fn()
+            job.last_error = None
+        except Exception as exc:
+            job.failures += 1
+            job.last_error = str(exc)
+            logger.error("调度任务 %s 失败: %s", job.name, exc)
+        finally:
+            with self._lock:
+                job.runs += 1
+                job.last_run = int(started)
+                job.last_duration_ms = int((time.time() - started) * 1000)
+                job.next_due = time.time() + job.interval
+                job.running = False
+
+    def run_due(self, force=False, wait_timeout=None):
+        """并发执行到期（force 时为全部）且未在运行中的任务，等待它们完成；返回执行的任务名"""
+        now = time.time()
+        with self._lock:
+            due = [job for job in self._jobs.values() if not job.running and (force or job.next_due <= now)]
+            for job in due:
+                job.running = True
+        futures = [self._executor.submit(self._run_job, job) for job in due]
+        wait(futures, timeout=wait_timeout)
+        return [job.name for job in due]
+
+    def _seconds_until_next(self):
+        with self._lock:
+            pending = [job.next_due for job in self._jobs.values() if not job.running]
+        return max(min(pending) - time.time(), 0) if pending else 1.0
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            self.run_due()
+            # 至多等待 30 秒再检查一次，新注册的任务不会等太久
+            self._stop.wait(min(max(self._seconds_until_next(), 0.5), 30))
+
+    def start(self):
+        """在后台线程中运行（重复调用无效）"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self.run_forever, name='crawl-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            jobs = {
+                job.name: {
+                    'interval_s': job.interval,
+                    'running': job.running,
+                    'runs': job.runs,
+                    'failures': job.failures,
+                    'last_run': job.last_run,
+                    'last_duration_ms': job.last_duration_ms,
+                    'last_error': job.last_error,
+                    'due_in_s': max(int(job.next_due - now), 0),
+                }
+                for job in self._jobs.values()
+            }
+        return {'mode': SCHEDULER_MODE, 'thread_alive': bool(self._thread and self._thread.is_alive()), 'jobs': jobs}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='独立运行的抓取调度进程')
+    parser.add_argument('--once', action='store_true', help='执行一次全部任务后退出')
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app  # 导入时注册任务；SCHEDULER_MODE=thread 时已有的后台线程与这里共用任务状态，不会重复执行
+
+    if args.once:
+        app._scheduler.run_due(force=True)
+        for name, job in app._scheduler.stats()['jobs'].items():
+            print(f"{name}: {job['last_duration_ms']}ms {job['last_error'] or 'ok'}")
+        return 0
+    try:
+        app._scheduler.run_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
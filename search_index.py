@@ -0,0 +1,137 @@
+"""新闻标题倒排索引。
+
+- 中文：按连续汉字切分，索引单字与相邻二字（bigram）
+- 拉丁文本与数字：按词索引，查询时匹配包含查询片段的词
+- 查询按空白切分为多个词项，各词项取交集（AND），最后对候选做一次子串校验，
+  结果与逐条 `词项 in 标题` 的判断一致，但耗时只与候选数量有关
+"""
+import re
+from functools import lru_cache
+
+from markupsafe import Markup
+
+_CJK_RE = re.compile('[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+_WORD_RE = re.compile(r'[0-9a-z]+')
+
+
+def index_terms(text):
+    """文本（已转小写）的索引词：返回 (汉字单字与相邻二字的集合, 拉丁词的集合)；归档的全文索引也按此切分"""
+    grams = set()
+    for run in _CJK_RE.findall(text):
+        grams.update(run)
+        grams.update(run[i:i + 2] for i in range(len(run) - 1))
+    return grams, set(_WORD_RE.findall(text))
+
+
+def query_terms(term):
+    """单个查询词项（已转小写）要查找的索引词：返回 (汉字单字或相邻二字列表, 拉丁片段列表)；
+    拉丁片段匹配包含它的词。两个列表都为空时词项中没有可索引的字符"""
+    grams = []
+    for run in _CJK_RE.findall(term):
+        if len(run) == 1:
+            grams.append(run)
+        else:
+            grams.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return grams, _WORD_RE.findall(term)
+
+
+class Query:
+    """解析后的搜索词：小写词项列表 + 预编译的高亮正则（每个查询只编译一次）"""
+
+    def __init__(self, search_text):
+        self.text = (search_text or '').strip().lower()
+        self.terms = list(dict.fromkeys(self.text.split()))
+        if self.terms:
+            # 长词优先，避免短词抢先匹配导致长词无法整体高亮
+            alternatives = sorted(self.terms, key=len, reverse=True)
+            self.pattern = re.compile('|'.join(re.escape(t) for t in alternatives), re.IGNORECASE)
+        else:
+            self.pattern = None
+
+    def __bool__(self):
+        return bool(self.terms)
+
+    def matches(self, title):
+        title = str(title or '').lower()
+        return all(term in title for term in self.terms)
+
+    def is_exact(self, title):
+        return str(title or '').lower() == self.text
+
+    def highlight(self, text):
+        if not text or self.pattern is None:
+            return text
+        return Markup(self.pattern.sub(lambda m: f'<mark>{m.group(0)}</mark>', str(text)))
+
+
+@lru_cache(maxsize=256)
+def parse_query(search_text):
+    return Query(search_text)
+
+
+class SearchIndex:
+    """单个来源新闻列表的倒排索引，在来源刷新时构建，之后只读"""
+
+    def __init__(self, items):
+        self.items = list(items)
+        self._titles = []
+        self._grams = {}  # 汉字单字/二字 -> set(位置)
+        self._words = {}  # 拉丁词 -> set(位置)
+        for pos, item in enumerate(self.items):
+            title = str(item.get('title', '')).lower()
+            self._titles.append(title)
+            grams, words = index_terms(title)
+            for term in grams:
+                self._grams.setdefault(term, set()).add(pos)
+            for word in words:
+                self._words.setdefault(word, set()).add(pos)
+        self._word_scan = {}  # 查询片段 -> 包含它的词的位置并集
+
+    def __len__(self):
+        return len(self.items)
+
+    def _word_candidates(self, fragment):
+        cached = self._word_scan.get(fragment)
+        if cached is None:
+            cached = set()
+            for word, postings in self._words.items():
+                if fragment in word:
+                    cached |= postings
+            if len(self._word_scan) > 1024:
+                self._word_scan.clear()
+            self._word_scan[fragment] = cached
+        return cached
+
+    def _term_candidates(self, term):
+        """单个词项的候选位置；词项中没有可索引的字符时返回 None（不限制）"""
+        grams, fragments = query_terms(term)
+        sets = [self._grams.get(gram, set()) for gram in grams]
+        sets.extend(self._word_candidates(fragment) for fragment in fragments)
+        if not sets:
+            return None
+        sets.sort(key=len)
+        result = set(sets[0])
+        for other in sets[1:]:
+            if not result:
+                break
+            result &= other
+        return result
+
+    def search(self, query):
+        """返回匹配 query 所有词项的新闻（保持原列表顺序）"""
+        if not isinstance(query, Query):
+            query = parse_query(query)
+        if not query:
+            return list(self.items)
+        candidates = None
+        for term in query.terms:
+            term_set = self._term_candidates(term)
+            if term_set is None:
+                continue
+            candidates = term_set if candidates is None else candidates & term_set
+            if not candidates:
+                return []
+        positions = range(len(self.items)) if candidates is None else sorted(candidates)
+        titles = self._titles
+        return [self.items[pos] for pos in positions
+                if all(term in titles[pos] for term in query.terms)]
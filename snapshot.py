@@ -0,0 +1,251 @@
+"""缓存快照：把新闻列表缓存、正文缓存与列表页验证器写入磁盘，新进程从快照恢复后即可直接提供数据。
+
+- 文件首行为 "NEWSSNAP <版本> <编码>"，其后是压缩后的数据：装了 msgpack 与 zstandard 时为 msgpack-zstd，
+  否则为 json-zlib（zlib 压缩的 JSON）；读取时按首行识别，不依赖当前配置
+- 先写同目录下的临时文件再 os.replace，读者不会看到写了一半的快照
+- 首次读取缓存时才加载（导入 app 时不读文件）；恢复时保留条目原来的时间戳，已过期的列表照常在后台刷新，
+  内存中已有更新数据的条目不被覆盖
+- 数据首次变化时立即在后台线程写入，此后至多每 SNAPSHOT_INTERVAL_S 秒写一次：间隔未到时安排在到期时写入，
+  不依赖之后还有新的变化；进程退出时再写一次（Vercel 等冻结实例上退出钩子不一定执行）
+
+配置：
+- SNAPSHOT_PATH：快照文件路径，留空（默认）时不启用
+- SNAPSHOT_INTERVAL_S：两次写入的最小间隔（默认 300）
+- SNAPSHOT_MAX_AGE_S：写入时间早于该时长（秒）的快照不再加载（默认 86400）
+- SNAPSHOT_CODEC：auto（默认）、json-zlib 或 msgpack-zstd
+
+另可作为独立进程运行：python snapshot.py 抓取全部来源后写出快照，可用于随部署附带初始快照
+（Vercel 上部署目录只读，快照无法在运行中更新，只用于冷启动）。
+"""
+import atexit
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+try:
+    import msgpack
+    import zstandard
+except ImportError:  # msgpack 与 zstandard 为可选依赖
+    msgpack = zstandard = None
+
+SNAPSHOT_PATH = os.environ.get('SNAPSHOT_PATH', '').strip()
+SNAPSHOT_INTERVAL_S = float(os.environ.get('SNAPSHOT_INTERVAL_S', '300'))
+SNAPSHOT_MAX_AGE_S = float(os.environ.get('SNAPSHOT_MAX_AGE_S', '86400'))
+SNAPSHOT_CODEC = os.environ.get('SNAPSHOT_CODEC', 'auto').strip().lower()
+
+_MAGIC = 'NEWSSNAP'
+_FORMAT_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+
+def _resolve_codec(codec):
+    if codec == 'auto':
+        return 'msgpack-zstd' if msgpack is not None else 'json-zlib'
+    if codec == 'msgpack-zstd' and msgpack is None:
+        logger.warning("未安装 msgpack/zstandard，快照改用 json-zlib")
+        return 'json-zlib'
+    return codec if codec in ('json-zlib', 'msgpack-zstd') else 'json-zlib'
+
+
+def dumps(state, codec='json-zlib'):
+    if codec == 'msgpack-zstd':
+        body = zstandard.ZstdCompressor(level=3).compress(msgpack.packb(state, use_bin_type=True))
+    else:
+        body = zlib.compress(json.dumps(state, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), 6)
+    return f'{_MAGIC} {_FORMAT_VERSION} {codec}\n'.encode('ascii') + body
+
+
+def loads(blob):
+    """解析快照；格式不符或缺少所需的库时抛出 ValueError"""
+    header, _, body = blob.partition(b'\n')
+    try:
+        magic, version, codec = header.decode('ascii').split()
+    except (UnicodeDecodeError, ValueError):
+        raise ValueError('不是快照文件')
+    if magic != _MAGIC or version != str(_FORMAT_VERSION):
+        raise ValueError(f'不支持的快照格式: {header[:40]!r}')
+    try:
+        if codec == 'msgpack-zstd':
+            if msgpack is None:
+                raise ValueError('读取该快照需要 msgpack 与 zstandard')
+            return msgpack.unpackb(zstandard.ZstdDecompressor().decompress(body), raw=False, strict_map_key=False)
+        if codec == 'json-zlib':
+            return json.loads(zlib.decompress(body).decode('utf-8'))
+    except (zlib.error, UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError(f'快照已损坏: {exc}')
+    raise ValueError(f'未知的快照编码: {codec}')
+
+
+def write_atomic(path, blob):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.snapshot-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class Snapshotter:
+    """collect() 返回要保存的状态（可序列化的 dict），restore(state) 把状态合并回内存"""
+
+    def __init__(self, collect, restore, path=SNAPSHOT_PATH, interval=SNAPSHOT_INTERVAL_S,
+                 max_age=SNAPSHOT_MAX_AGE_S, codec=SNAPSHOT_CODEC):
+        self.collect = collect
+        self.restore = restore
+        self.path = path
+        self.interval = interval
+        self.max_age = max_age
+        self.codec = _resolve_codec(codec)
+        self.enabled = bool(path)
+        self._loaded = not self.enabled
+        self._load_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saving = False
+        self._timer = None  # 间隔未到时安排的写入
+        self._last_save = 0.0  # 首次有变化时立即写入
+        self._stats = {'loads': 0, 'load_ms': None, 'snapshot_age_s': None, 'saves': 0, 'save_failures': 0,
+                       'last_save_ms': None, 'last_size_bytes': None, 'last_error': None}
+        if self.enabled:
+            atexit.register(self.save_at_exit)
+
+    def ensure_loaded(self):
+        """首次调用时加载快照（并发调用只加载一次）；之后调用几乎没有开销"""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            try:
+                self._load()
+            finally:
+                self._loaded = True
+
+    def _load(self):
+        started = time.perf_counter()
+        try:
+            with open(self.path, 'rb') as f:
+                state = loads(f.read())
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            logger.warning("读取快照失败 %s: %s", self.path, exc)
+            self._stats['last_error'] = str(exc)
+            return
+        age = time.time() - state.get('ts', 0)
+        if age > self.max_age:
+            logger.info("快照已超过 %ds（%ds），不再加载", self.max_age, age)
+            return
+        self.restore(state)
+        self._stats['loads'] += 1
+        self._stats['load_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        self._stats['snapshot_age_s'] = int(age)
+        logger.info("已从快照恢复（%.1fms，快照写于 %ds 前）", self._stats['load_ms'], age)
+
+    def mark_dirty(self):
+        """缓存有变化：距上次写入已超过间隔时立即在后台线程写入快照，否则安排在间隔到期时写入"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._dirty = True
+            self._schedule_locked()
+
+    def _schedule_locked(self):
+        # 正在写入或已安排写入时不重复安排；写入期间的新变化在写入结束后再安排
+        if self._saving or self._timer is not None:
+            return
+        wait = self._last_save + self.interval - time.time()
+        if wait > 0:
+            self._timer = threading.Timer(wait, self._save_in_background)
+            self._timer.name = 'snapshot-writer'
+            self._timer.daemon = True
+            self._timer.start()
+        else:
+            self._saving = True
+            threading.Thread(target=self._save_in_background, name='snapshot-writer', daemon=True).start()
+
+    def _save_in_background(self):
+        with self._lock:
+            self._timer = None
+            self._saving = True
+        saved = False
+        try:
+            saved = self.save()
+        finally:
+            with self._lock:
+                self._saving = False
+                # 写入失败时不立即重试，等下一次变化
+                if saved and self._dirty:
+                    self._schedule_locked()
+
+    def save(self, force=False):
+        """写入快照（无变化且未指定 force 时跳过）；返回是否写入"""
+        if not self.enabled:
+            return False
+        # 尚未加载快照时写入会丢掉快照中的数据
+        self.ensure_loaded()
+        with self._lock:
+            if not (self._dirty or force):
+                return False
+            self._dirty = False
+            self._last_save = time.time()
+        started = time.perf_counter()
+        try:
+            state = self.collect()
+            state['ts'] = time.time()
+            blob = dumps(state, self.codec)
+            write_atomic(self.path, blob)
+        except Exception as exc:
+            with self._lock:
+                self._dirty = True
+            self._stats['save_failures'] += 1
+            self._stats['last_error'] = str(exc)
+            logger.error("写入快照失败 %s: %s", self.path, exc)
+            return False
+        self._stats['saves'] += 1
+        self._stats['last_save_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        self._stats['last_size_bytes'] = len(blob)
+        return True
+
+    def save_at_exit(self):
+        if self.enabled and self._loaded:
+            self.save()
+
+    def stats(self):
+        result = dict(self._stats)
+        result.update({'path': self.path, 'codec': self.codec, 'loaded': self._loaded, 'dirty': self._dirty,
+                       'interval_s': self.interval})
+        return result
+
+
+def main(argv=None):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app
+
+    if not app._snapshot.enabled:
+        print('未设置 SNAPSHOT_PATH')
+        return 1
+    app.crawl_batch()
+    app._snapshot.save(force=True)
+    stats = app._snapshot.stats()
+    print(f"{stats['path']}: {stats['last_size_bytes']} bytes ({stats['codec']})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""结构化日志：按级别过滤、DEBUG 抽样、按调用位置限流，经队列异步写出。
+
+热点路径（列表抓取中每个选择器、每个被跳过的链接）使用 logger.debug 和 % 占位符，
+被级别、抽样或限流丢弃的记录不会格式化消息，也不会做任何 I/O。通过的记录放入有界队列，
+由后台线程写到 stderr；队列满时直接丢弃并计数，不阻塞请求。
+
+配置：
+- LOG_LEVEL：日志级别（默认本地 DEBUG、Vercel 上 INFO）
+- LOG_FORMAT：text（默认）或 json（每行一个 JSON 对象）
+- LOG_DEBUG_SAMPLE_RATE：DEBUG 记录的保留比例（默认 1）
+- LOG_RATE_LIMIT / LOG_RATE_WINDOW_S：同一调用位置在一个窗口内最多输出的条数（默认 50 条/10 秒，0 表示不限），
+  超出的条数在下一个窗口的第一条记录中注明
+- LOG_ASYNC：是否经队列异步写出（默认本地 1；Vercel 上 0，函数冻结后后台线程无法及时写出）
+- LOG_QUEUE_SIZE：异步队列长度（默认 10000）
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+import time
+
+_lock = threading.Lock()
+_stats = {'emitted': 0, 'sampled_out': 0, 'rate_limited': 0, 'queue_dropped': 0}
+_listener = None
+
+
+def _count(field, amount=1):
+    with _lock:
+        _stats[field] += amount
+
+
+class SamplingFilter(logging.Filter):
+    """按比例保留 DEBUG 记录；更高级别的记录全部保留"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.rate >= 1 or random.random() < self.rate:
+            return True
+        _count('sampled_out')
+        return False
+
+
+class RateLimitFilter(logging.Filter):
+    """按调用位置（文件+行号）限流；ERROR 及以上不限流"""
+
+    def __init__(self, limit, window):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self._sites = {}  # (pathname, lineno) -> [窗口开始时间, 窗口内条数, 被抑制的条数]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if not self.limit or record.levelno >= logging.ERROR:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None or now - site[0] >= self.window:
+                suppressed = site[2] if site else 0
+                self._sites[key] = [now, 1, 0]
+            elif site[1] < self.limit:
+                site[1] += 1
+                suppressed = 0
+            else:
+                site[2] += 1
+                _count('rate_limited')
+                return False
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class _BoundedQueueHandler(logging.handlers.QueueHandler):
+    """队列满时丢弃记录而不是阻塞或报错"""
+
+    def prepare(self, record):
+        """只把参数合并进 msg；基类还会把异常堆栈拼进 msg 并清掉 exc_info，
+        这里保留异常信息，由输出处理器的格式化器决定如何输出（如 JSON 的 exc 字段）"""
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _count('queue_dropped')
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        line = super().format(record)
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            line += f' (此前 {suppressed} 条同位置日志被限流)'
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'thread': record.threadName,
+        }
+        if getattr(record, 'suppressed', 0):
+            entry['suppressed'] = record.suppressed
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _CountingHandler(logging.StreamHandler):
+    def emit(self, record):
+        super().emit(record)
+        _count('emitted')
+
+
+def setup(default_level=logging.DEBUG, default_async=True):
+    """配置根日志器；重复调用时只保留最后一次的配置"""
+    global _listener
+    level = getattr(logging, os.environ.get('LOG_LEVEL', '').strip().upper() or logging.getLevelName(default_level),
+                    default_level)
+    if os.environ.get('LOG_FORMAT', 'text').strip().lower() == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = TextFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    filters = [
+        SamplingFilter(float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', '1'))),
+        RateLimitFilter(int(os.environ.get('LOG_RATE_LIMIT', '50')), float(os.environ.get('LOG_RATE_WINDOW_S', '10'))),
+    ]
+    use_async = os.environ.get('LOG_ASYNC', '1' if default_async else '0') != '0'
+
+    output = _CountingHandler()
+    output.setFormatter(formatter)
+    if use_async:
+        log_queue = queue.Queue(maxsize=int(os.environ.get('LOG_QUEUE_SIZE', '10000')))
+        handler = _BoundedQueueHandler(log_queue)
+    else:
+        handler = output
+    for log_filter in filters:
+        handler.addFilter(log_filter)
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    root = logging.getLogger()
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level)
+    if use_async:
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+    return root
+
+
+def stop():
+    """停止后台写出线程并写完队列中剩余的记录"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop)
+
+
+def stats():
+    with _lock:
+        result = dict(_stats)
+    result['level'] = logging.getLevelName(logging.getLogger().level)
+    result['async'] = _listener is not None
+    return result
@@ -0,0 +1,172 @@
+"""按请求记录调用片段（span），生成 Server-Timing 响应头，并保留抽样的慢请求轨迹。
+
+每个请求在 before_request 中开始一条轨迹，保存在 contextvars 中；span() / traced() 在没有轨迹时
+几乎没有开销（后台刷新、预取、基准测试中直接调用）。提交到线程池的任务需要经 submit() 复制上下文，
+其中的 span 才会记到发起请求的轨迹上。
+
+配置：
+- SERVER_TIMING：是否输出 Server-Timing 头（默认 1）
+- TRACE_SLOW_MS：超过该耗时（毫秒）的请求才保留轨迹（默认 1000）
+- TRACE_SAMPLE_RATE：慢请求中保留轨迹的比例（默认 1）
+- TRACE_BUFFER_SIZE：最多保留的慢请求轨迹条数（默认 50）
+"""
+import contextvars
+import functools
+import itertools
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '1') != '0'
+TRACE_SLOW_MS = float(os.environ.get('TRACE_SLOW_MS', '1000'))
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', '1'))
+TRACE_BUFFER_SIZE = int(os.environ.get('TRACE_BUFFER_SIZE', '50'))
+
+# 单条轨迹最多记录的 span 数，防止循环中的调用把轨迹撑得过大
+MAX_SPANS_PER_TRACE = 200
+
+_current = contextvars.ContextVar('news_trace', default=None)
+_ids = itertools.count(1)
+_slow_traces = deque(maxlen=TRACE_BUFFER_SIZE)
+_lock = threading.Lock()
+_stats = {'traced': 0, 'slow': 0, 'kept': 0, 'dropped_spans': 0}
+
+
+class Trace:
+    """一个请求的轨迹；span 可能来自线程池中的多个线程，追加时加锁"""
+
+    def __init__(self, method, path):
+        self.id = next(_ids)
+        self.method = method
+        self.path = path
+        self.ts = int(time.time())
+        self.started = time.perf_counter()
+        self.spans = []  # [(name, detail, start_s, duration_s, thread_name)]
+        self.dropped = 0
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def add(self, name, detail, started, duration):
+        with self._lock:
+            # 请求结束后仍在后台运行的任务（如超过聚合截止时间的抓取）不再写入
+            if self.closed:
+                return
+            if len(self.spans) >= MAX_SPANS_PER_TRACE:
+                self.dropped += 1
+                return
+            self.spans.append((name, detail, started - self.started, duration, threading.current_thread().name))
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            return time.perf_counter() - self.started
+
+    def server_timing(self, total):
+        """按 span 名称汇总：同名 span 的耗时相加，desc 中给出次数"""
+        totals = OrderedDict()
+        for name, _detail, _start, duration, _thread in self.spans:
+            spent, count = totals.get(name, (0.0, 0))
+            totals[name] = (spent + duration, count + 1)
+        parts = [f'{name};dur={spent * 1000:.1f};desc="x{count}"' for name, (spent, count) in totals.items()]
+        parts.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(parts)
+
+    def to_dict(self, total, status):
+        return {
+            'id': self.id,
+            'ts': self.ts,
+            'method': self.method,
+            'path': self.path,
+            'status': status,
+            'duration_ms': round(total * 1000, 1),
+            'dropped_spans': self.dropped,
+            'spans': [
+                {
+                    'name': name,
+                    'detail': detail,
+                    'start_ms': round(start * 1000, 1),
+                    'duration_ms': round(duration * 1000, 1),
+                    'thread': thread,
+                }
+                for name, detail, start, duration, thread in sorted(self.spans, key=lambda s: s[2])
+            ],
+        }
+
+
+def start(method, path):
+    """开始一条请求轨迹，返回用于 finish() 的令牌"""
+    trace = Trace(method, path)
+    return _current.set(trace)
+
+
+def finish(token, status):
+    """结束当前请求的轨迹：返回 Server-Timing 头的值（未启用时为 None），慢请求按抽样保留"""
+    trace = _current.get()
+    _current.reset(token)
+    if trace is None:
+        return None
+    total = trace.close()
+    with _lock:
+        _stats['traced'] += 1
+        _stats['dropped_spans'] += trace.dropped
+        if total * 1000 >= TRACE_SLOW_MS:
+            _stats['slow'] += 1
+            if random.random() < TRACE_SAMPLE_RATE:
+                _stats['kept'] += 1
+                _slow_traces.append(trace.to_dict(total, status))
+    return trace.server_timing(total) if SERVER_TIMING else None
+
+
+@contextmanager
+def span(name, detail=None):
+    """记录一个 span：with tracing.span('render_template'): ..."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, detail, started, time.perf_counter() - started)
+
+
+def traced(name, detail_arg=None):
+    """把整个函数记为一个 span 的装饰器；detail_arg 为作为说明记录的位置参数下标（如来源名称）"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return fn(*args, **kwargs)
+            detail = str(args[detail_arg]) if detail_arg is not None and len(args) > detail_arg else None
+            with span(name, detail):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def submit(executor, fn, *args, **kwargs):
+    """在复制的上下文中把任务提交到线程池，使任务中的 span 记到当前请求的轨迹上"""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def recent(limit=None, min_ms=0):
+    """最近保留的慢请求轨迹，新的在前"""
+    with _lock:
+        traces = [t for t in reversed(_slow_traces) if t['duration_ms'] >= min_ms]
+    return traces[:limit] if limit is not None else traces
+
+
+def stats():
+    with _lock:
+        result = dict(_stats)
+    result.update({
+        'server_timing': SERVER_TIMING,
+        'slow_ms': TRACE_SLOW_MS,
+        'sample_rate': TRACE_SAMPLE_RATE,
+        'buffer_size': TRACE_BUFFER_SIZE,
+    })
+    return result
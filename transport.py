@@ -0,0 +1,216 @@
+"""fetch_url 之下的可插拔传输层：真实请求、录制、回放，以及可配置的故障注入。
+
+模式（TRANSPORT_MODE）：
+- live（默认）：经 http_session 发出真实请求
+- record：真实请求，同时把响应写入 TRANSPORT_DIR
+- replay：只从 TRANSPORT_DIR 读取录制的响应，不访问网络；没有录制时按连接失败处理
+
+故障注入对以上任一模式生效，用于在本地模拟上游变慢或不稳定：
+- FAULT_LATENCY_MS：每个请求增加的延迟，可写固定值 "200" 或区间 "100-500"
+- FAULT_TIMEOUT_RATE：按该比例等待 timeout 秒后抛出超时
+- FAULT_5XX_RATE：按该比例直接返回 503
+- FAULT_TRUNCATE_RATE：按该比例把正文截断为一半
+- FAULT_HOSTS：只对这些主机注入（逗号分隔，留空表示全部）
+- FAULT_SEED：随机种子，设置后每次运行注入的故障序列相同
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import quote_plus, urlsplit
+
+import requests
+
+import http_session
+import instrumentation
+import tracing
+
+TRANSPORT_MODE = os.environ.get('TRANSPORT_MODE', 'live').strip().lower()
+TRANSPORT_DIR = os.environ.get('TRANSPORT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recordings'))
+
+FAULT_LATENCY_MS = os.environ.get('FAULT_LATENCY_MS', '').strip()
+FAULT_TIMEOUT_RATE = float(os.environ.get('FAULT_TIMEOUT_RATE', '0'))
+FAULT_5XX_RATE = float(os.environ.get('FAULT_5XX_RATE', '0'))
+FAULT_TRUNCATE_RATE = float(os.environ.get('FAULT_TRUNCATE_RATE', '0'))
+FAULT_HOSTS = {h.strip().lower() for h in os.environ.get('FAULT_HOSTS', '').split(',') if h.strip()}
+FAULT_SEED = os.environ.get('FAULT_SEED', '').strip()
+
+_lock = threading.Lock()
+_random = random.Random(FAULT_SEED or None)
+_stats = {
+    'requests': 0,
+    'recorded': 0,
+    'replay_hits': 0,
+    'replay_misses': 0,
+    'injected_latency_ms': 0,
+    'injected_timeouts': 0,
+    'injected_5xx': 0,
+    'injected_truncations': 0,
+}
+
+
+def _parse_latency(spec):
+    if not spec:
+        return None
+    low, _, high = spec.partition('-')
+    low = float(low)
+    return (low, float(high) if high else low)
+
+
+_latency_range = _parse_latency(FAULT_LATENCY_MS)
+
+
+def _count(field, amount=1):
+    with _lock:
+        _stats[field] += amount
+
+
+def _recording_key(url):
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+
+def _recording_paths(url):
+    key = _recording_key(url)
+    return os.path.join(TRANSPORT_DIR, f'{key}.json'), os.path.join(TRANSPORT_DIR, f'{key}.body')
+
+
+def build_response(url, status_code, headers, content):
+    response = requests.Response()
+    response.url = url
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response._content = content
+    return response
+
+
+def record(url, response):
+    """把响应写入录制目录（先写临时文件再改名，避免并发读到半个文件）"""
+    os.makedirs(TRANSPORT_DIR, exist_ok=True)
+    meta_path, body_path = _recording_paths(url)
+    meta = {
+        'url': url,
+        'status_code': response.status_code,
+        'headers': {k: v for k, v in response.headers.items()
+                    if k.lower() not in ('content-encoding', 'transfer-encoding', 'content-length', 'connection')},
+        'recorded_at': int(time.time()),
+    }
+    for path, data in ((body_path, response.content or b''),
+                       (meta_path, json.dumps(meta, ensure_ascii=False, indent=2).encode('utf-8'))):
+        tmp_path = f'{path}.tmp{threading.get_ident()}'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    _count('recorded')
+
+
+def replay(url, headers=None):
+    """读取录制的响应；请求带有匹配的 If-None-Match 时返回 304"""
+    meta_path, body_path = _recording_paths(url)
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        with open(body_path, 'rb') as f:
+            content = f.read()
+    except FileNotFoundError:
+        _count('replay_misses')
+        raise requests.ConnectionError(f'回放模式下没有录制: {url}')
+    _count('replay_hits')
+    etag = meta['headers'].get('ETag') or meta['headers'].get('etag')
+    if etag and headers and headers.get('If-None-Match') == etag:
+        return build_response(url, 304, {'ETag': etag}, b'')
+    return build_response(url, meta['status_code'], meta['headers'], content)
+
+
+def _faults_configured():
+    return bool(_latency_range or FAULT_TIMEOUT_RATE or FAULT_5XX_RATE or FAULT_TRUNCATE_RATE)
+
+
+def _faults_apply(url):
+    if not _faults_configured():
+        return False
+    return not FAULT_HOSTS or urlsplit(url).netloc.lower() in FAULT_HOSTS
+
+
+def passthrough():
+    """live 模式且未配置故障注入：其他客户端（如 aiohttp）可以绕过这里直接请求"""
+    return TRANSPORT_MODE == 'live' and not _faults_configured()
+
+
+def target_for(url):
+    """实际请求地址；设置了 PROXY_BASE 时经由代理：PROXY_BASE + '?url=' + urlencode(url)"""
+    proxy_base = os.environ.get('PROXY_BASE', '').strip()
+    if not proxy_base:
+        return url
+    # 确保末尾没有多余斜杠，避免 //
+    return f"{proxy_base.rstrip('/')}?url={quote_plus(url)}"
+
+
+def _roll(rate):
+    if rate <= 0:
+        return False
+    with _lock:
+        return _random.random() < rate
+
+
+def get(url, headers=None, timeout=10, target=None):
+    """fetch_url 使用的发送入口；url 为原始地址（录制文件以它为键），target 为实际请求地址（如经代理）"""
+    _count('requests')
+    host = urlsplit(url).netloc.lower()
+    try:
+        with instrumentation.stage('download', host), tracing.span('upstream', host):
+            response = _send(url, headers, timeout, target)
+    except requests.RequestException as exc:
+        instrumentation.UPSTREAM_ERRORS.inc(host=host, error=type(exc).__name__)
+        raise
+    instrumentation.UPSTREAM_RESPONSES.inc(host=host, status=response.status_code)
+    return response
+
+
+def _send(url, headers, timeout, target):
+    faulty = _faults_apply(url)
+    timeout_s = timeout[-1] if isinstance(timeout, tuple) else timeout
+
+    if faulty and _latency_range:
+        with _lock:
+            delay_ms = _random.uniform(*_latency_range)
+        if timeout_s is not None and delay_ms / 1000 >= timeout_s:
+            time.sleep(timeout_s)
+            _count('injected_timeouts')
+            raise requests.ReadTimeout(f'注入延迟 {delay_ms:.0f}ms 超过超时 {timeout_s}s: {url}')
+        time.sleep(delay_ms / 1000)
+        _count('injected_latency_ms', int(delay_ms))
+    if faulty and _roll(FAULT_TIMEOUT_RATE):
+        time.sleep(timeout_s or 0)
+        _count('injected_timeouts')
+        raise requests.ReadTimeout(f'注入超时: {url}')
+    if faulty and _roll(FAULT_5XX_RATE):
+        _count('injected_5xx')
+        return build_response(url, 503, {'Content-Type': 'text/html'}, b'<html>503 Service Unavailable</html>')
+
+    if TRANSPORT_MODE == 'replay':
+        response = replay(url, headers)
+    else:
+        response = http_session.get(target or url, headers=headers, timeout=timeout)
+        if TRANSPORT_MODE == 'record' and response.status_code != 304:
+            record(url, response)
+
+    if faulty and response.content and _roll(FAULT_TRUNCATE_RATE):
+        _count('injected_truncations')
+        response._content = response.content[:len(response.content) // 2]
+    return response
+
+
+def stats():
+    with _lock:
+        result = dict(_stats)
+    result['mode'] = TRANSPORT_MODE
+    result['faults'] = {
+        'latency_ms': FAULT_LATENCY_MS or None,
+        'timeout_rate': FAULT_TIMEOUT_RATE,
+        '5xx_rate': FAULT_5XX_RATE,
+        'truncate_rate': FAULT_TRUNCATE_RATE,
+        'hosts': sorted(FAULT_HOSTS),
+    }
+    return result